@@ -0,0 +1,404 @@
+"""
+Offline analysis of recorded exam audio
+
+Every WAV file of a directory is streamed through the same voice activity
+detector as the live microphone, its speech segments are transcribed and
+matched against the question paper index, and the result is written as a
+JSON file per recording. The main process only runs the cheap voice
+activity detector; the time range of every speech segment is sent to a
+process pool whose workers load the speech recognition backend once, read
+the range from the file and transcribe it, so one long recording keeps
+every worker busy. Every transcribed segment is appended to a checkpoint
+next to the result, and a recording whose result is already written for
+the same file, question paper and backend is skipped, so an interrupted
+run continues with the segments it had not finished.
+
+Usage: python audio_batch.py recordings/ --paper paper.txt --backend vosk
+"""
+
+import os
+import json
+import time
+import wave
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+
+from audio_capture import SpeechSegment, VoiceActivityDetector, Resampler, downmix
+from keyword_index import QuestionPaperIndex
+from speech_recognizer import BACKENDS, get_speech_recognizer
+
+# the index and recognizer of a worker process, set by _init_worker
+_index = None
+_recognizer = None
+
+
+def find_recordings(audio_dir, extensions=('.wav',)):
+    """Sorted paths of the recordings under a directory"""
+    paths = []
+    for root, _, files in os.walk(audio_dir):
+        for name in files:
+            if name.lower().endswith(extensions):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def read_segments(path, sample_rate=16000, chunk_s=1.0, **vad_params):
+    """
+    Stream a WAV file through the voice activity detector
+
+    Parameters
+    ----------
+    path : string
+        Path to a 16 bit PCM WAV file of any rate and channel count
+    sample_rate : int, optional
+        Rate the audio is resampled to. The default is 16000.
+    chunk_s : float, optional
+        Seconds of audio read at a time. The default is 1.
+    **vad_params
+        Passed to VoiceActivityDetector
+
+    Yields
+    ------
+    segment : SpeechSegment
+        Speech segments, timed from the start of the file
+
+    """
+    with wave.open(path, 'rb') as f:
+        if f.getsampwidth() != 2:
+            raise ValueError("{} is not 16 bit PCM".format(path))
+        rate, channels = f.getframerate(), f.getnchannels()
+        resample = Resampler(rate, sample_rate) if rate != sample_rate else None
+        vad = VoiceActivityDetector(sample_rate=sample_rate, **vad_params)
+        frames = max(int(rate * chunk_s), 1)
+        while True:
+            data = f.readframes(frames)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype=np.int16)
+            if channels > 1 or resample is not None:
+                samples = downmix(samples, channels)
+                if resample is not None:
+                    samples = resample(samples)
+                samples = np.clip(np.round(samples), -32768, 32767).astype(np.int16)
+            yield from vad.process(samples)
+        yield from vad.flush()
+
+
+def read_range(path, start, end, sample_rate=16000):
+    """
+    Read part of a WAV file as a speech segment
+
+    Parameters
+    ----------
+    path : string
+        Path to a 16 bit PCM WAV file of any rate and channel count
+    start, end : float
+        Time range in seconds from the start of the file
+    sample_rate : int, optional
+        Rate the audio is resampled to. The default is 16000.
+
+    Returns
+    -------
+    segment : SpeechSegment
+
+    """
+    with wave.open(path, 'rb') as f:
+        rate, channels = f.getframerate(), f.getnchannels()
+        first = min(int(round(start * rate)), f.getnframes())
+        f.setpos(first)
+        data = f.readframes(max(int(round(end * rate)) - first, 0))
+    samples = np.frombuffer(data, dtype=np.int16)
+    if channels > 1 or rate != sample_rate:
+        samples = downmix(samples, channels)
+        if rate != sample_rate:
+            samples = Resampler(rate, sample_rate)(samples)
+        samples = np.clip(np.round(samples), -32768, 32767).astype(np.int16)
+    return SpeechSegment(samples, sample_rate, start, end)
+
+
+def analyze_file(path, index, recognizer):
+    """
+    Transcribe a recording and match it against the question paper
+
+    Parameters
+    ----------
+    path : string
+        Path to the WAV file
+    index : keyword_index.QuestionPaperIndex
+        Index of the question paper
+    recognizer : speech_recognizer.SpeechRecognizer
+        Speech recognition backend
+
+    Returns
+    -------
+    result : dict
+        The file's duration, its recognized segments with their keyword hits
+        and the question paper words spoken
+
+    """
+    with wave.open(path, 'rb') as f:
+        duration = f.getnframes() / f.getframerate()
+    segments = []
+    words = set()
+    for segment in read_segments(path):
+        try:
+            text = recognizer.recognize(segment)
+        except Exception as e:
+            print("Speech recognition error in {} at {:.1f}s: {}".format(path, segment.start, e))
+            continue
+        if not text:
+            continue
+        hits = index.match(text, segment.start, segment.end)
+        words.update(hit.word for hit in hits)
+        segments.append({
+            'start': round(segment.start, 3),
+            'end': round(segment.end, 3),
+            'text': text,
+            'keywords': [hit.word for hit in hits]
+        })
+    return {
+        'duration': round(duration, 3),
+        'segments': segments,
+        'common_words': sorted(words)
+    }
+
+
+def result_path(path, audio_dir, out_dir):
+    """JSON result path of a recording, mirroring the directory layout"""
+    return os.path.join(out_dir, os.path.relpath(path, audio_dir) + '.json')
+
+
+def source_info(path, index, backend):
+    """What a result was computed from, to tell whether it is still valid"""
+    stat = os.stat(path)
+    return {
+        'file': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'paper_sha256': index.source_hash,
+        'backend': backend
+    }
+
+
+def is_done(path, out_path, index, backend):
+    try:
+        with open(out_path) as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return False
+    info = source_info(path, index, backend)
+    return all(result.get(k) == v for k, v in info.items())
+
+
+def checkpoint_path(out_path):
+    """Checkpoint of the segments of a recording transcribed so far"""
+    return out_path + '.partial'
+
+
+def load_checkpoint(path, out_path, index, backend):
+    """
+    Segments already transcribed for a recording
+
+    The checkpoint holds one JSON line per segment after a line with the
+    source info. It is ignored when it was written for another version of
+    the file, question paper or backend.
+
+    Returns
+    -------
+    records : dict
+        Segment records keyed by their rounded (start, end)
+
+    """
+    try:
+        with open(checkpoint_path(out_path)) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+    records = {}
+    try:
+        if not lines or json.loads(lines[0]) != source_info(path, index, backend):
+            return {}
+        for line in lines[1:]:
+            record = json.loads(line)
+            records[record['start'], record['end']] = record
+    except ValueError:
+        pass  # a line cut short by an interrupted run, keep the ones before it
+    return records
+
+
+def _init_worker(index, backend):
+    global _index, _recognizer
+    _index = index
+    _recognizer = get_speech_recognizer(backend)
+
+
+def _recognize(path, start, end):
+    """Transcribe and match one segment of a recording, in a worker"""
+    t = time.perf_counter()
+    text = _recognizer.recognize(read_range(path, start, end))
+    hits = _index.match(text, start, end) if text else []
+    return {
+        'start': round(start, 3),
+        'end': round(end, 3),
+        'text': text,
+        'keywords': [hit.word for hit in hits],
+        'seconds': round(time.perf_counter() - t, 3)
+    }
+
+
+class _Recording:
+    """Checkpoint and pending segments of a recording being analyzed"""
+    def __init__(self, path, out_path, info, records):
+        self.path = path
+        self.out_path = out_path
+        self.info = info
+        self.records = records
+        self.pending = 0
+        self.checkpoint = None
+
+    def add(self, record):
+        if self.checkpoint is None:
+            os.makedirs(os.path.dirname(self.out_path) or '.', exist_ok=True)
+            # rewritten rather than appended to, a previous run may have cut its last line short
+            self.checkpoint = open(checkpoint_path(self.out_path), 'w')
+            self.checkpoint.write(json.dumps(self.info) + '\n')
+            for done in sorted(self.records.values(), key=lambda r: r['start']):
+                self.checkpoint.write(json.dumps(done) + '\n')
+        self.checkpoint.write(json.dumps(record) + '\n')
+        self.checkpoint.flush()
+        self.records[record['start'], record['end']] = record
+
+    def finish(self):
+        """Write the result of the recording and remove its checkpoint"""
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+        with wave.open(self.path, 'rb') as f:
+            duration = f.getnframes() / f.getframerate()
+        records = sorted(self.records.values(), key=lambda r: r['start'])
+        result = dict(self.info)
+        result.update({
+            'duration': round(duration, 3),
+            'segments': [{k: r[k] for k in ('start', 'end', 'text', 'keywords')}
+                         for r in records if r['text']],
+            'common_words': sorted({w for r in records for w in r['keywords']}),
+            'seconds': round(sum(r['seconds'] for r in records), 3)
+        })
+        os.makedirs(os.path.dirname(self.out_path) or '.', exist_ok=True)
+        # written under a temporary name, so an interrupted run leaves no half result
+        tmp_path = self.out_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        os.replace(tmp_path, self.out_path)
+        try:
+            os.remove(checkpoint_path(self.out_path))
+        except OSError:
+            pass
+        return result
+
+
+def analyze_directory(audio_dir, out_dir, paper_path, backend=None, workers=None, resume=True):
+    """
+    Analyze every recording of a directory on a process pool
+
+    The recordings are split into speech segments in this process and every
+    segment is transcribed as its own task, so the work is spread over the
+    workers even for a single long recording. Finished segments are
+    checkpointed one by one.
+
+    Parameters
+    ----------
+    audio_dir : string
+        Directory of WAV recordings, searched recursively
+    out_dir : string
+        Directory the JSON results are written to
+    paper_path : string
+        Path to the question paper text file
+    backend : string, optional
+        speech_recognizer backend. The default is the value of the
+        PROCTORING_ASR environment variable or 'google'.
+    workers : int, optional
+        Number of worker processes. The default is the number of CPUs.
+    resume : bool, optional
+        Skip recordings whose result is up to date and segments already
+        checkpointed. The default is True.
+
+    Returns
+    -------
+    results : dict
+        Result of every recording analyzed in this run, by path
+
+    """
+    if backend is None:
+        backend = os.environ.get('PROCTORING_ASR', 'google')
+    index = QuestionPaperIndex.load_or_build(paper_path)
+    paths = find_recordings(audio_dir)
+    todo = [p for p in paths
+            if not (resume and is_done(p, result_path(p, audio_dir, out_dir), index, backend))]
+    print("{} recordings, {} already analyzed".format(len(paths), len(paths) - len(todo)))
+
+    results = {}
+    if not todo:
+        return results
+
+    def finish(recording):
+        result = recording.finish()
+        results[recording.path] = result
+        print("[{}/{}] {}: {:.0f}s of audio, {} segments, {} common words".format(
+            len(results), len(todo), recording.path, result['duration'],
+            len(result['segments']), len(result['common_words'])))
+
+    def collect(done):
+        for future in done:
+            recording, start = futures.pop(future)
+            try:
+                recording.add(future.result())
+            except Exception as e:
+                print("Speech recognition error in {} at {:.1f}s: {!r}".format(
+                    recording.path, start, e))
+            recording.pending -= 1
+            if recording.pending == 0:
+                finish(recording)
+
+    futures = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(index, backend)) as pool:
+        for path in todo:
+            out_path = result_path(path, audio_dir, out_dir)
+            try:
+                info = source_info(path, index, backend)
+                records = load_checkpoint(path, out_path, index, backend) if resume else {}
+                ranges = [(segment.start, segment.end) for segment in read_segments(path)
+                          if (round(segment.start, 3), round(segment.end, 3)) not in records]
+            except Exception as e:
+                print("Error: Could not analyze {}: {!r}".format(path, e))
+                continue
+            recording = _Recording(path, out_path, info, records)
+            for start, end in ranges:
+                futures[pool.submit(_recognize, path, start, end)] = (recording, start)
+            recording.pending = len(ranges)
+            if recording.pending == 0:
+                finish(recording)
+            # record what finished while this file was being split
+            collect(wait(futures, timeout=0, return_when=FIRST_COMPLETED).done)
+        while futures:
+            collect(wait(futures, return_when=FIRST_COMPLETED).done)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze recorded exam audio")
+    parser.add_argument('audio_dir', help="directory of WAV recordings")
+    parser.add_argument('--out', default='audio_results', help="directory of the JSON results")
+    parser.add_argument('--paper', default='paper.txt', help="question paper text file")
+    parser.add_argument('--backend', choices=BACKENDS, help="speech recognition backend")
+    parser.add_argument('--workers', type=int, help="worker processes")
+    parser.add_argument('--no-resume', action='store_true', help="analyze every recording again")
+    args = parser.parse_args()
+
+    analyze_directory(args.audio_dir, args.out, args.paper, args.backend, args.workers,
+                      resume=not args.no_resume)
+
+
+if __name__ == '__main__':
+    main()
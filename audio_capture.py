@@ -0,0 +1,548 @@
+"""
+Streaming microphone capture with voice activity detection
+
+PyAudio chunks are written into a ring buffer and scored by a vectorized
+energy / zero-crossing voice activity detector. Only voiced segments are
+cut out of the ring buffer and handed on as in-memory ``SpeechSegment``
+buffers, so no WAV files are written and speech recognition only runs on
+the time the candidate actually speaks.
+"""
+
+import time
+import queue
+import threading
+from collections import namedtuple
+import numpy as np
+
+# mono int16 samples, their sample rate, and start and end in seconds since
+# the start of the stream
+SpeechSegment = namedtuple('SpeechSegment', ['audio', 'sample_rate', 'start', 'end'])
+
+
+class RingBuffer:
+    """
+    Fixed size buffer holding the most recent samples of a stream
+
+    Samples are addressed by their absolute index in the stream, i.e. the
+    number of samples written before them.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of samples kept
+    dtype : np.dtype, optional
+        Sample type. The default is np.int16.
+
+    """
+    def __init__(self, capacity, dtype=np.int16):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=dtype)
+        self.written = 0
+
+    def write(self, samples):
+        total = len(samples)
+        # only the last capacity samples are kept, at their absolute indices
+        samples = samples[-self.capacity:]
+        n = len(samples)
+        start = (self.written + total - n) % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:n - first] = samples[first:]
+        self.written += total
+
+    def skip(self, n):
+        """Advance the stream by n samples that were lost"""
+        self.written += n
+
+    def read(self, start, end):
+        """
+        Copy of the samples with absolute indices [start, end)
+
+        Samples that already left the buffer are skipped.
+        """
+        start = max(start, self.written - self.capacity, 0)
+        end = min(end, self.written)
+        if end <= start:
+            return self.buffer[:0].copy()
+        indices = np.arange(start, end) % self.capacity
+        return self.buffer[indices]
+
+
+def frame_features(samples, frame_length):
+    """
+    Energy and zero-crossing rate of consecutive frames
+
+    Parameters
+    ----------
+    samples : np.int16
+        Mono samples, trailing samples not filling a frame are ignored
+    frame_length : int
+        Number of samples per frame
+
+    Returns
+    -------
+    energy : np.float32
+        Energy of every frame in dB relative to full scale
+    zcr : np.float32
+        Fraction of sign changes between consecutive samples of every frame
+
+    """
+    n = len(samples) // frame_length
+    frames = samples[:n * frame_length].reshape(n, frame_length).astype(np.float32) / 32768.0
+    energy = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_length - 1)
+    return energy.astype(np.float32), zcr.astype(np.float32)
+
+
+class VoiceActivityDetector:
+    """
+    Energy / zero-crossing voice activity detector over a sample stream
+
+    A frame is voiced if its energy is ``margin_db`` above the noise floor
+    and its zero-crossing rate below ``max_zcr``, which rejects hiss and fan
+    noise. The noise floor is estimated from the first ``calibration_ms``
+    and then follows the unvoiced frames, replacing a separate ambient noise
+    adjustment. A segment starts at the first voiced frame, padded by
+    ``padding_ms`` of audio before it, and ends after ``hangover_ms`` of
+    silence.
+
+    Parameters
+    ----------
+    sample_rate : int, optional
+        Sample rate of the stream. The default is 16000.
+    frame_ms : int, optional
+        Frame length. The default is 30.
+    margin_db : float, optional
+        Energy above the noise floor of a voiced frame. The default is 10.
+    max_zcr : float, optional
+        Maximum zero-crossing rate of a voiced frame. The default is 0.35.
+    calibration_ms : int, optional
+        Initial noise floor estimation time. The default is 500.
+    hangover_ms : int, optional
+        Silence that ends a segment. The default is 300.
+    padding_ms : int, optional
+        Audio kept before the first voiced frame. The default is 200.
+    min_speech_ms : int, optional
+        Shorter segments are dropped as clicks. The default is 250.
+    max_segment_s : float, optional
+        Longer segments are split. The default is 15.
+    buffer_s : float, optional
+        Length of the ring buffer. The default is 30.
+
+    """
+    def __init__(self, sample_rate=16000, frame_ms=30, margin_db=10.0, max_zcr=0.35,
+                 calibration_ms=500, hangover_ms=300, padding_ms=200, min_speech_ms=250,
+                 max_segment_s=15.0, buffer_s=30.0):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.margin_db = margin_db
+        self.max_zcr = max_zcr
+        self.calibration_frames = max(1, calibration_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.padding = int(sample_rate * padding_ms / 1000)
+        self.min_speech = int(sample_rate * min_speech_ms / 1000)
+        self.max_segment = int(sample_rate * max_segment_s)
+        self.ring = RingBuffer(int(sample_rate * max(buffer_s, max_segment_s + 1)))
+        self.noise_floor = None
+        self._calibration = []
+        self._pending = np.zeros(0, dtype=np.int16)
+        # stream index of the first pending sample
+        self._position = 0
+        self._speech_start = None
+        self._first_voiced = None
+        self._last_voiced = None
+        self._silent_frames = 0
+
+    def process(self, samples):
+        """
+        Feed samples of the stream
+
+        Parameters
+        ----------
+        samples : np.int16
+            Next mono samples
+
+        Returns
+        -------
+        segments : list of SpeechSegment
+            Segments completed by these samples
+
+        """
+        self.ring.write(samples)
+        samples = np.concatenate([self._pending, samples])
+        energy, zcr = frame_features(samples, self.frame_length)
+        self._pending = samples[len(energy) * self.frame_length:]
+
+        position = self._position
+        self._position += len(energy) * self.frame_length
+        if self.noise_floor is None:
+            take = self.calibration_frames - len(self._calibration)
+            self._calibration.extend(energy[:take])
+            if len(self._calibration) < self.calibration_frames:
+                return []
+            self.noise_floor = float(np.median(self._calibration))
+            energy, zcr = energy[take:], zcr[take:]
+            position += take * self.frame_length
+
+        voiced = (energy > self.noise_floor + self.margin_db) & (zcr < self.max_zcr)
+        segments = []
+        for i in range(len(voiced)):
+            frame_end = position + (i + 1) * self.frame_length
+            if voiced[i]:
+                if self._speech_start is None:
+                    self._first_voiced = frame_end - self.frame_length
+                    self._speech_start = max(self._first_voiced - self.padding, 0)
+                self._last_voiced = frame_end
+                self._silent_frames = 0
+            elif self._speech_start is not None:
+                self._silent_frames += 1
+                if self._silent_frames >= self.hangover_frames:
+                    segments.extend(self._end_segment(frame_end))
+            elif energy[i] < self.noise_floor + self.margin_db:
+                # follow slow changes of the background noise
+                self.noise_floor += 0.05 * (float(energy[i]) - self.noise_floor)
+            if (self._speech_start is not None
+                    and frame_end - self._speech_start >= self.max_segment):
+                segments.extend(self._end_segment(frame_end, split=True))
+        return segments
+
+    @property
+    def in_speech(self):
+        """Whether a segment is in progress at the end of the samples fed so far"""
+        return self._speech_start is not None
+
+    def flush(self):
+        """End the stream, returning the segment in progress if any"""
+        if self._speech_start is None:
+            return []
+        return self._end_segment(self._position)
+
+    def skip(self, n):
+        """
+        Account for n samples of the stream that were lost
+
+        The segment in progress is ended, so no segment spans the gap and
+        the times of later segments stay right.
+
+        Returns
+        -------
+        segments : list of SpeechSegment
+            The segment in progress if any
+
+        """
+        segments = self.flush()
+        lost = n + len(self._pending)
+        self.ring.skip(n)
+        self._pending = self._pending[:0]
+        self._position += lost
+        return segments
+
+    def _end_segment(self, end, split=False):
+        start, first_voiced, last_voiced = self._speech_start, self._first_voiced, self._last_voiced
+        if split:
+            # continue the speech right where the split segment ends
+            self._speech_start = self._first_voiced = self._last_voiced = end
+        else:
+            self._speech_start = None
+            end = min(end, last_voiced + self.padding)
+        self._silent_frames = 0
+        if last_voiced - first_voiced < self.min_speech:
+            return []
+        audio = self.ring.read(start, end)
+        return [SpeechSegment(audio, self.sample_rate, start / self.sample_rate,
+                              end / self.sample_rate)]
+
+
+def downmix(samples, channels):
+    """
+    Average interleaved int16 channels to mono
+
+    Parameters
+    ----------
+    samples : np.int16
+        Interleaved samples
+    channels : int
+        Number of channels
+
+    Returns
+    -------
+    mono : np.float32
+
+    """
+    samples = samples.astype(np.float32)
+    if channels == 1:
+        return samples
+    return samples.reshape(-1, channels).mean(axis=1)
+
+
+class Resampler:
+    """
+    Streaming polyphase resampler
+
+    Resamples by the rational factor out_rate / in_rate with a windowed sinc
+    low-pass filter split into its polyphase components, so only the output
+    samples are ever computed. The last input samples are kept between calls,
+    so resampling a stream chunk by chunk gives the same samples as
+    resampling it at once.
+
+    Parameters
+    ----------
+    in_rate : int
+        Input sample rate
+    out_rate : int
+        Output sample rate
+    taps_per_phase : int, optional
+        Filter length per polyphase component. The default is 24.
+
+    """
+    def __init__(self, in_rate, out_rate, taps_per_phase=24):
+        g = np.gcd(in_rate, out_rate)
+        self.up, self.down = out_rate // g, in_rate // g
+        n = taps_per_phase * self.up
+        # low-pass at the lower Nyquist frequency of both rates, on the upsampled rate
+        cutoff = 0.5 / max(self.up, self.down)
+        t = np.arange(n) - (n - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(n, 8.0)
+        h *= self.up / h.sum()
+        # phases[p, k] = h[p + k * up], reversed to run over the input in order
+        self.phases = h.reshape(taps_per_phase, self.up).T[:, ::-1].astype(np.float32).copy()
+        self.taps = taps_per_phase
+        self._history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        self._consumed = 0
+        self._produced = 0
+
+    def __call__(self, samples):
+        """
+        Resample the next samples of the stream
+
+        Parameters
+        ----------
+        samples : np.array
+            Mono samples
+
+        Returns
+        -------
+        resampled : np.float32
+
+        """
+        x = np.concatenate([self._history, samples.astype(np.float32, copy=False)])
+        consumed = self._consumed + len(samples)
+        # outputs whose last input sample has arrived
+        end = -(-consumed * self.up // self.down)
+        m = np.arange(self._produced, end)
+        positions = m * self.down
+        n, phase = positions // self.up, positions % self.up
+        windows = np.lib.stride_tricks.sliding_window_view(x, self.taps)
+        out = np.einsum('ij,ij->i', windows[n - self._consumed], self.phases[phase])
+
+        self._history = x[len(x) - (self.taps - 1):]
+        self._consumed = consumed
+        self._produced = end
+        return out
+
+
+def negotiate_format(pa, device_index=None, sample_rate=16000, channels=1):
+    """
+    Pick the capture format closest to the wanted one that the device supports
+
+    Tries the wanted rate and channels first, then the device's default rate,
+    with mono before stereo.
+
+    Parameters
+    ----------
+    pa : pyaudio.PyAudio
+    device_index : int, optional
+        Input device. The default is None, the default input device.
+    sample_rate : int, optional
+        Wanted sample rate. The default is 16000.
+    channels : int, optional
+        Wanted channels. The default is 1.
+
+    Returns
+    -------
+    sample_rate, channels : int
+        Format to open the stream with
+
+    """
+    import pyaudio
+    if device_index is None:
+        info = pa.get_default_input_device_info()
+    else:
+        info = pa.get_device_info_by_index(device_index)
+    default_rate = int(info['defaultSampleRate'])
+    max_channels = max(1, int(info['maxInputChannels']))
+    candidates = [(sample_rate, channels), (sample_rate, 2), (default_rate, channels),
+                  (default_rate, 2), (default_rate, max_channels)]
+    for rate, ch in candidates:
+        if ch > max_channels:
+            continue
+        try:
+            if pa.is_format_supported(rate, input_device=info['index'], input_channels=ch,
+                                      input_format=pyaudio.paInt16):
+                return rate, ch
+        except ValueError:
+            # PyAudio raises instead of returning False for unsupported formats
+            continue
+    return default_rate, max_channels
+
+
+class AudioCapture:
+    """
+    Continuous microphone capture feeding the voice activity detector
+
+    One persistent thread reads the PyAudio stream and puts the chunks on a
+    bounded queue, a second thread runs the voice activity detector on them
+    and hands on the voiced segments. The stream is never closed between
+    segments, so no audio is lost while they are recognized. If the detector
+    or ``on_segment`` falls behind for longer than the queue holds, the
+    oldest chunks are dropped and counted; the detector is told about the
+    gap so the segment times stay right.
+
+    Parameters
+    ----------
+    on_segment : callable
+        Called with every ``SpeechSegment`` from the detector thread. It may
+        block for a while to push back, e.g. ``RecognitionPool.submit``.
+    sample_rate : int, optional
+        Sample rate of the segments. The default is 16000.
+    chunk : int, optional
+        Samples per read at ``sample_rate``. The default is 1024.
+    capture_rate, capture_channels : int, optional
+        Format the device is opened with. The default is None, which asks
+        for mono at ``sample_rate`` and falls back to a format the device
+        supports. Other formats are downmixed and resampled as soon as they
+        are read.
+    device_index : int, optional
+        PyAudio input device. The default is None, the default device.
+    on_activity : callable, optional
+        Called from the detector thread after every chunk with the
+        ``time.monotonic()`` time the chunk ends at and whether speech is
+        in progress. The default is None.
+    max_chunks : int, optional
+        Chunks the queue holds, 64 chunks of 1024 samples are about 4 s at
+        16 kHz. The default is 64.
+    **vad_params
+        Passed to ``VoiceActivityDetector``
+
+    """
+    def __init__(self, on_segment, sample_rate=16000, chunk=1024, capture_rate=None,
+                 capture_channels=None, device_index=None, on_activity=None, max_chunks=64,
+                 **vad_params):
+        self.on_segment = on_segment
+        self.on_activity = on_activity
+        self.sample_rate = sample_rate
+        self.chunk = chunk
+        self.capture_format = (capture_rate, capture_channels)
+        self.device_index = device_index
+        self.vad = VoiceActivityDetector(sample_rate, **vad_params)
+        self.captured_chunks = 0
+        self.dropped_chunks = 0
+        self.overflows = 0
+        self.segments = 0
+        # time.monotonic() of the start of the stream, segment times are relative to it
+        self.start_time = None
+        self._chunks = queue.Queue(maxsize=max_chunks)
+        self._running = False
+        self._threads = []
+
+    def start(self):
+        self._running = True
+        self._threads = [threading.Thread(target=self._capture, name='audio-capture', daemon=True),
+                         threading.Thread(target=self._detect, name='audio-vad', daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop capturing, handing on the queued audio and the segment in progress"""
+        self._running = False
+        for thread in self._threads:
+            thread.join()
+
+    def stats(self):
+        """Counters of the capture and its queue"""
+        return {
+            'captured_chunks': self.captured_chunks,
+            'dropped_chunks': self.dropped_chunks,
+            'overflows': self.overflows,
+            'queued_chunks': self._chunks.qsize(),
+            'capture_format': self.capture_format,
+            'segments': self.segments
+        }
+
+    def _put(self, item):
+        while True:
+            try:
+                self._chunks.put_nowait(item)
+                return
+            except queue.Full:
+                # keep up with the microphone, the oldest audio goes
+                try:
+                    self._chunks.get_nowait()
+                    self.dropped_chunks += 1
+                except queue.Empty:
+                    pass
+
+    def _capture(self):
+        import pyaudio
+        pa = pyaudio.PyAudio()
+        stream = None
+        position = 0
+        try:
+            rate, channels = self.capture_format
+            if rate is None or channels is None:
+                rate, channels = negotiate_format(pa, self.device_index, self.sample_rate)
+                self.capture_format = (rate, channels)
+            resample = Resampler(rate, self.sample_rate) if rate != self.sample_rate else None
+            frames = int(round(self.chunk * rate / self.sample_rate))
+            stream = pa.open(format=pyaudio.paInt16, channels=channels, rate=rate,
+                             frames_per_buffer=frames, input=True,
+                             input_device_index=self.device_index)
+            self.start_time = time.monotonic()
+            while self._running:
+                try:
+                    data = stream.read(frames)
+                except IOError as e:
+                    if e.errno != pyaudio.paInputOverflowed:
+                        raise
+                    # the driver buffer overran and its audio is lost
+                    self.overflows += 1
+                    position += self.chunk
+                    continue
+                samples = np.frombuffer(data, dtype=np.int16)
+                if channels > 1 or resample is not None:
+                    samples = downmix(samples, channels)
+                    if resample is not None:
+                        samples = resample(samples)
+                    samples = np.clip(np.round(samples), -32768, 32767).astype(np.int16)
+                self._put((position, samples))
+                self.captured_chunks += 1
+                position += len(samples)
+        except Exception as e:
+            print("Audio capture error: {}".format(e))
+        finally:
+            if stream is not None:
+                stream.stop_stream()
+                stream.close()
+            pa.terminate()
+            self._put(None)
+
+    def _detect(self):
+        position = 0
+        while True:
+            item = self._chunks.get()
+            if item is None:
+                segments = self.vad.flush()
+            else:
+                start, samples = item
+                segments = self.vad.skip(start - position) if start > position else []
+                segments += self.vad.process(samples)
+                position = start + len(samples)
+                if self.on_activity is not None:
+                    self.on_activity(self.start_time + position / self.sample_rate,
+                                     self.vad.in_speech)
+            for segment in segments:
+                self.segments += 1
+                self.on_segment(segment)
+            if item is None:
+                return
@@ -1,134 +1,111 @@
-import speech_recognition as sr
-import pyaudio
-import wave
 import time
 import threading
-import os
-
-def read_audio(stream, filename):
-    chunk = 1024  # Record in chunks of 1024 samples
-    sample_format = pyaudio.paInt16  # 16 bits per sample
-    channels = 2
-    fs = 44100  # Record at 44100 samples per second
-    seconds = 10 # Number of seconds to record at once
-    filename = filename
-    frames = []  # Initialize array to store frames
-    
-    for i in range(0, int(fs / chunk * seconds)):
-        data = stream.read(chunk)
-        frames.append(data)
-    
-    # Save the recorded data as a WAV file
-    wf = wave.open(filename, 'wb')
-    wf.setnchannels(channels)
-    wf.setsampwidth(p.get_sample_size(sample_format))
-    wf.setframerate(fs)
-    wf.writeframes(b''.join(frames))
-    wf.close()
-    # Stop and close the stream
-    stream.stop_stream()
-    stream.close()
-
-def convert(i):
-    if i >= 0:
-        sound = 'record' + str(i) +'.wav'
-        r = sr.Recognizer()
-        
-        with sr.AudioFile(sound) as source:
-            r.adjust_for_ambient_noise(source)
-            print("Converting Audio To Text and saving to file..... ") 
-            audio = r.listen(source)
-        try:
-            value = r.recognize_google(audio) ##### API call to google for speech recognition
-            os.remove(sound)
-            if str is bytes: 
-                result = u"{}".format(value).encode("utf-8")
-            else: 
-                result = "{}".format(value)
- 
+
+from audio_capture import AudioCapture
+from keyword_index import QuestionPaperIndex
+from speaker_detector import SpeakerDetector
+from speech_recognizer import get_speech_recognizer, RecognitionPool
+
+class TranscriptWriter:
+    '''
+    Saves recognized text and matches it against the question paper as it arrives
+
+    :param index: keyword_index.QuestionPaperIndex of the question paper
+    '''
+    def __init__(self, index):
+        self.index = index
+        self.hits = []
+        self.lock = threading.Lock()
+
+    def start_session(self):
+        '''
+        Empty final.txt, which holds the content words of the current session only
+        '''
+        with self.lock:
+            open("final.txt","w").close()
+
+    def __call__(self, segment, text):
+        '''
+        Append the text of a segment to test.txt and its content words to final.txt
+
+        :param segment: audio_capture.SpeechSegment the text was recognized in
+        :param text: recognized text
+        '''
+        hits = self.index.match(text, segment.start, segment.end)
+        with self.lock:
             with open("test.txt","a") as f:
-                f.write(result)
+                f.write(text)
                 f.write(" ")
-                f.close()
-                
-        except sr.UnknownValueError:
-            print("")
-        except sr.RequestError as e:
-            print("{0}".format(e))
-        except KeyboardInterrupt:
-            pass
-
-p = pyaudio.PyAudio()  # Create an interface to PortAudio
-chunk = 1024  # Record in chunks of 1024 samples
-sample_format = pyaudio.paInt16  # 16 bits per sample
-channels = 2
-fs = 44100
-
-def save_audios(i):
-    stream = p.open(format=sample_format,channels=channels,rate=fs,
-                frames_per_buffer=chunk,input=True)
-    filename = 'record'+str(i)+'.wav'
-    read_audio(stream, filename)
-
-for i in range(30//10): # Number of total seconds to record/ Number of seconds per recording
-    t1 = threading.Thread(target=save_audios, args=[i]) 
-    x = i-1
-    t2 = threading.Thread(target=convert, args=[x]) # send one earlier than being recorded
-    t1.start() 
-    t2.start() 
-    t1.join() 
-    t2.join() 
-    if i==2:
-        flag = True
-if flag:
-    convert(i)
-    p.terminate()
-
-
-from nltk.corpus import stopwords 
-from nltk.tokenize import word_tokenize 
-
-file = open("test.txt") ## Student speech file
-data = file.read()
-file.close()
-stop_words = set(stopwords.words('english'))   
-word_tokens = word_tokenize(data) ######### tokenizing sentence
-filtered_sentence = [w for w in word_tokens if not w in stop_words]  
-filtered_sentence = [] 
-  
-for w in word_tokens:   ####### Removing stop words
-    if w not in stop_words: 
-        filtered_sentence.append(w) 
-
-####### creating a final file
-f=open('final.txt','w')
-for ele in filtered_sentence:
-    f.write(ele+' ')
-f.close()
-    
-##### checking whether proctor needs to be alerted or not
-file = open("paper.txt") ## Question file
-data = file.read()
-file.close()
-stop_words = set(stopwords.words('english'))   
-word_tokens = word_tokenize(data) ######### tokenizing sentence
-filtered_questions = [w for w in word_tokens if not w in stop_words]  
-filtered_questions = [] 
-  
-for w in word_tokens:   ####### Removing stop words
-    if w not in stop_words: 
-        filtered_questions.append(w) 
-        
-def common_member(a, b):     
-    a_set = set(a) 
-    b_set = set(b) 
-      
-    # check length  
-    if len(a_set.intersection(b_set)) > 0: 
-        return(a_set.intersection(b_set))   
-    else: 
-        return([]) 
-
-comm = common_member(filtered_questions, filtered_sentence)
-print('Number of common elements:', len(comm))
-print(comm)
+            with open("final.txt","a") as f:
+                for word in self.index.content_words(text):
+                    f.write(word+' ')
+            self.hits.extend(hits)
+        for hit in hits: ##### alert the proctor right away
+            print('Question paper keyword "{}" spoken at {:.1f}s'.format(hit.word, hit.start))
+
+def print_speaker(event):
+    '''
+    Alert the proctor of a second voice
+
+    :param event: speaker_detector.SpeakerEvent
+    '''
+    print("Second speaker detected: {} segments, {:.1f}s of speech between {:.1f}s and {:.1f}s".format(
+        event.segments, event.speech_s, event.start, event.end))
+
+def record_speech(index, seconds=30, backend=None, workers=2):
+    '''
+    Capture the microphone and convert the voiced segments to text in memory
+
+    :param index: keyword_index.QuestionPaperIndex of the question paper
+    :param seconds: Number of total seconds to record
+    :param backend: speech_recognizer backend, default PROCTORING_ASR or google
+    :param workers: Number of speech recognition workers
+    :return: list of keyword_index.KeywordHit
+    '''
+    print("Converting Audio To Text and saving to file..... ")
+    writer = TranscriptWriter(index)
+    writer.start_session()
+    # a busy pool holds the detector back for a while before dropping speech
+    pool = RecognitionPool(get_speech_recognizer(backend), writer, workers=workers,
+                           max_wait=2.0)
+    # the first seconds of speech enroll the candidate's voice
+    speakers = SpeakerDetector(print_speaker)
+
+    def on_segment(segment):
+        speakers.process(segment)
+        pool.submit(segment)
+
+    capture = AudioCapture(on_segment)
+    capture.start()
+    end = time.monotonic() + seconds
+    try:
+        while time.monotonic() < end:
+            time.sleep(min(60, max(end - time.monotonic(), 0)))
+            print_stats(capture, pool)
+    except KeyboardInterrupt:
+        pass
+    capture.stop()
+    pool.close()
+    print_stats(capture, pool)
+    return writer.hits
+
+def print_stats(capture, pool):
+    '''
+    Report audio or speech that was lost because processing fell behind
+
+    :param capture: audio_capture.AudioCapture
+    :param pool: speech_recognizer.RecognitionPool
+    '''
+    capture_stats, pool_stats = capture.stats(), pool.stats()
+    if capture_stats['dropped_chunks'] or capture_stats['overflows'] or pool_stats['dropped']:
+        print("Audio dropped: {} chunks, {} overflows, {} segments".format(
+            capture_stats['dropped_chunks'], capture_stats['overflows'], pool_stats['dropped']))
+
+if __name__ == "__main__":
+    index = QuestionPaperIndex.load_or_build("paper.txt") ## Question file
+    hits = record_speech(index, 30)
+
+    ##### checking whether proctor needs to be alerted or not
+    comm = sorted(set(hit.word for hit in hits))
+    print('Number of common elements:', len(comm))
+    print(comm)
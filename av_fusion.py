@@ -0,0 +1,306 @@
+"""
+Audio-visual fusion of mouth opening and voice activity
+
+The mouth opening detector and the microphone's voice activity detector
+report their observations on the ``time.monotonic()`` clock. The fusion
+engine keeps both as timelines with cumulative counts, so the share of open
+mouth frames and voiced audio chunks in any window is two binary searches,
+and scores sliding windows as new observations arrive:
+    voice without mouth movement - another person is speaking
+    mouth movement without voice - the candidate is whispering
+Speech segments are scored the same way over their own time span, and only
+those that look like another speaker are passed on to speech recognition,
+which is by far the most expensive step.
+"""
+
+import time
+import threading
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+OTHER_SPEAKER = 'other_speaker'
+WHISPERING = 'whispering'
+
+# kind of the event, its start and end on the time.monotonic() clock, and
+# the highest window score during the event
+FusionEvent = namedtuple('FusionEvent', ['kind', 'start', 'end', 'score'])
+
+
+class Timeline:
+    """
+    Boolean observations over time
+
+    Parameters
+    ----------
+    history_s : float, optional
+        Seconds of observations kept. The default is 60.
+
+    """
+    def __init__(self, history_s=60.0):
+        self.history_s = history_s
+        self.times = []
+        # counts[i] is the number of true observations before times[i]
+        self.counts = [0]
+
+    @property
+    def latest(self):
+        return self.times[-1] if self.times else None
+
+    def add(self, t, value):
+        """Add an observation, times must not decrease"""
+        self.times.append(t)
+        self.counts.append(self.counts[-1] + bool(value))
+        if t - self.times[0] > 2 * self.history_s:
+            old = bisect_left(self.times, t - self.history_s)
+            del self.times[:old]
+            del self.counts[:old]
+
+    def share(self, start, end):
+        """
+        Observations between start and end
+
+        Returns
+        -------
+        n : int
+            Number of observations
+        share : float
+            Share of true observations, 0 if there are none
+
+        """
+        i, j = bisect_left(self.times, start), bisect_right(self.times, end)
+        n = j - i
+        return n, (self.counts[j] - self.counts[i]) / n if n else 0.0
+
+
+class FusionEngine:
+    """
+    Fuses mouth opening and voice activity on sliding windows
+
+    Observations can be added from different threads. Windows and segments
+    are only scored once both streams are ``lag_s`` past them, to allow for
+    the audio queue and the video frame rate.
+
+    Parameters
+    ----------
+    on_event : callable, optional
+        Called with a ``FusionEvent`` when a run of windows scoring above
+        ``threshold`` ends. The default is None.
+    on_flagged : callable, optional
+        Called with (segment, score) for speech segments that look like
+        another speaker, e.g. ``RecognitionPool.submit``. The default is None.
+    window_s : float, optional
+        Length of the sliding windows. The default is 2.
+    step_s : float, optional
+        Step between windows. The default is 0.25.
+    threshold : float, optional
+        Score from which a window or segment is flagged. The default is 0.6.
+    mouth_active : float, optional
+        Share of open mouth frames that counts as a moving mouth, speech
+        opens the mouth in only part of the frames. The default is 0.3.
+    min_frames : int, optional
+        Face frames a window needs to be scored. A speech segment with
+        fewer is always flagged, as it cannot be put down to the candidate.
+        The default is 5.
+    lag_s : float, optional
+        Delay of the scoring behind the latest observation. The default is 0.5.
+    max_wait_s : float, optional
+        Seconds of audio after a speech segment after which it is scored
+        without waiting for more video, e.g. while no face is found. The
+        default is 2.
+    history_s : float, optional
+        Seconds of observations kept. The default is 60.
+
+    """
+    def __init__(self, on_event=None, on_flagged=None, window_s=2.0, step_s=0.25, threshold=0.6,
+                 mouth_active=0.3, min_frames=5, lag_s=0.5, max_wait_s=2.0, history_s=60.0):
+        self.on_event = on_event
+        self.on_flagged = on_flagged
+        self.window_s = window_s
+        self.step_s = step_s
+        self.threshold = threshold
+        self.mouth_active = mouth_active
+        self.min_frames = min_frames
+        self.lag_s = lag_s
+        self.max_wait_s = max_wait_s
+        self.mouth = Timeline(history_s)
+        self.voice = Timeline(history_s)
+        self.flagged_segments = 0
+        self.skipped_segments = 0
+        self._lock = threading.Lock()
+        self._pending = []
+        self._active = {}
+        self._next_window = None
+
+    def add_mouth(self, t, is_open):
+        """Add a video frame, at time.monotonic() t, whose face has an open mouth or not"""
+        with self._lock:
+            self.mouth.add(t, is_open)
+            events, flagged = self._update()
+        self._notify(events, flagged)
+
+    def add_voice(self, t, voiced):
+        """Add voice activity at time.monotonic() t, e.g. from ``AudioCapture.on_activity``"""
+        with self._lock:
+            self.voice.add(t, voiced)
+            events, flagged = self._update()
+        self._notify(events, flagged)
+
+    def add_speech(self, segment, start_time):
+        """
+        Add a speech segment to be scored once the video has caught up
+
+        Parameters
+        ----------
+        segment : audio_capture.SpeechSegment
+            Segment timed from the start of its stream
+        start_time : float
+            time.monotonic() time of the start of the stream, e.g.
+            ``AudioCapture.start_time``
+
+        """
+        with self._lock:
+            self._pending.append((segment, start_time + segment.start, start_time + segment.end))
+            events, flagged = self._update()
+        self._notify(events, flagged)
+
+    def close(self):
+        """Score the pending segments and end the events in progress"""
+        with self._lock:
+            flagged = [self._score_segment(*item) for item in self._pending]
+            self._pending = []
+            events = [self._end_event(kind, self._next_window - self.step_s)
+                      for kind in list(self._active)]
+        self._notify(events, flagged)
+
+    def scores(self, start, end):
+        """
+        Scores of a time span
+
+        Returns
+        -------
+        scores : dict
+            Score of OTHER_SPEAKER and WHISPERING between 0 and 1, or None if
+            the span has fewer than ``min_frames`` face frames or no audio
+
+        """
+        n_mouth, mouth = self.mouth.share(start, end)
+        n_voice, voice = self.voice.share(start, end)
+        if n_mouth < self.min_frames or n_voice == 0:
+            return None
+        moving = min(mouth / self.mouth_active, 1.0)
+        return {
+            OTHER_SPEAKER: voice * (1 - moving),
+            WHISPERING: moving * (1 - voice)
+        }
+
+    def _update(self):
+        events = []
+        if self.mouth.latest is not None and self.voice.latest is not None:
+            events = self._score_windows(min(self.mouth.latest, self.voice.latest) - self.lag_s)
+
+        flagged = []
+        pending = []
+        for item in self._pending:
+            end = item[2]
+            if ((self.mouth.latest is not None and self.mouth.latest - self.lag_s >= end)
+                    or (self.voice.latest is not None and self.voice.latest - end >= self.max_wait_s)):
+                flagged.append(self._score_segment(*item))
+            else:
+                pending.append(item)
+        self._pending = pending
+        return events, flagged
+
+    def _score_windows(self, clock):
+        events = []
+        if self._next_window is None:
+            self._next_window = clock
+        while self._next_window <= clock:
+            end = self._next_window
+            scores = self.scores(end - self.window_s, end) or {}
+            for kind in (OTHER_SPEAKER, WHISPERING):
+                score = scores.get(kind, 0.0)
+                if score >= self.threshold:
+                    start, peak = self._active.get(kind, (end - self.window_s, 0.0))
+                    self._active[kind] = (start, max(peak, score))
+                elif kind in self._active:
+                    events.append(self._end_event(kind, end - self.step_s))
+            self._next_window += self.step_s
+        return events
+
+    def _end_event(self, kind, end):
+        start, peak = self._active.pop(kind)
+        return FusionEvent(kind, start, end, peak)
+
+    def _score_segment(self, segment, start, end):
+        scores = self.scores(start, end)
+        score = 1.0 if scores is None else scores[OTHER_SPEAKER]
+        if score >= self.threshold:
+            self.flagged_segments += 1
+            return segment, score
+        self.skipped_segments += 1
+        return None
+
+    def _notify(self, events, flagged):
+        # outside the lock, the callbacks may block
+        if self.on_event is not None:
+            for event in events:
+                self.on_event(event)
+        if self.on_flagged is not None:
+            for item in flagged:
+                if item is not None:
+                    self.on_flagged(*item)
+
+
+def run_fusion(video_path=None, paper_path="paper.txt", backend=None, workers=2):
+    """
+    Watch the mouth and listen to the microphone, transcribing only the
+    speech that the fusion flags
+
+    Parameters
+    ----------
+    video_path : string, optional
+        Path of the video. The default is None, the webcam.
+    paper_path : string, optional
+        Question paper text file. The default is "paper.txt".
+    backend : string, optional
+        speech_recognizer backend. The default is the value of the
+        PROCTORING_ASR environment variable or 'google'.
+    workers : int, optional
+        Number of speech recognition workers. The default is 2.
+
+    """
+    from audio_capture import AudioCapture
+    from audio_part import TranscriptWriter
+    from keyword_index import QuestionPaperIndex
+    from mouth_opening_detector import mouth_opening_detector
+    from speech_recognizer import get_speech_recognizer, RecognitionPool
+
+    writer = TranscriptWriter(QuestionPaperIndex.load_or_build(paper_path))
+    writer.start_session()
+    pool = RecognitionPool(get_speech_recognizer(backend), writer, workers=workers)
+    start = time.monotonic()
+
+    def on_event(event):
+        if event.kind == OTHER_SPEAKER:
+            message = "Voice without mouth movement, another person may be speaking"
+        else:
+            message = "Mouth movement without voice, the candidate may be whispering"
+        print("{} ({:.1f}s to {:.1f}s, score {:.2f})".format(
+            message, event.start - start, event.end - start, event.score))
+
+    engine = FusionEngine(on_event, lambda segment, score: pool.submit(segment))
+    capture = AudioCapture(lambda segment: engine.add_speech(segment, capture.start_time),
+                           on_activity=engine.add_voice)
+    capture.start()
+    try:
+        mouth_opening_detector(video_path, on_mouth=engine.add_mouth)
+    finally:
+        capture.stop()
+        engine.close()
+        pool.close()
+    print("Speech segments recognized: {}, skipped: {}".format(
+        engine.flagged_segments, engine.skipped_segments))
+
+
+if __name__ == '__main__':
+    run_fusion()
@@ -0,0 +1,95 @@
+"""
+Compare object detector backends on recorded clips
+
+Every backend is run on the same frames and compared against a reference
+backend, whose detections are taken as ground truth. Reported per backend:
+    latency  - mean / p95 time of one detect() call in ms
+    person   - recall of persons (matched count / reference count)
+    phone    - recall of frames in which the reference found a phone
+
+Usage: python benchmark_detectors.py clip1.mp4 [clip2.mp4 ...]
+"""
+
+import argparse
+import time
+import cv2
+import numpy as np
+
+from object_detector import get_object_detector, count_objects, BACKENDS
+
+
+def read_frames(paths, every=5, max_frames=200):
+    """Read every n-th frame of the clips"""
+    frames = []
+    for path in paths:
+        cap = cv2.VideoCapture(path)
+        index = 0
+        while len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index % every == 0:
+                frames.append(frame)
+            index += 1
+        cap.release()
+    return frames
+
+
+def run_backend(detector, frames):
+    """Run a detector on all frames, returning summaries and latencies"""
+    detector.detect(frames[0])  # warm up
+    results, latencies = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        detections = detector.detect(frame)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(count_objects(detections))
+    return results, np.array(latencies)
+
+
+def recall(results, reference):
+    """Person and phone recall of results against the reference"""
+    persons = sum(min(r[0], ref[0]) for r, ref in zip(results, reference))
+    ref_persons = sum(ref[0] for ref in reference)
+    phones = sum(r[1] and ref[1] for r, ref in zip(results, reference))
+    ref_phones = sum(ref[1] for ref in reference)
+    person_recall = persons / ref_persons if ref_persons else float('nan')
+    phone_recall = phones / ref_phones if ref_phones else float('nan')
+    return person_recall, phone_recall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark object detector backends")
+    parser.add_argument('clips', nargs='+', help="recorded video clips")
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--reference', default='yolov3', choices=BACKENDS,
+                        help="backend used as ground truth")
+    parser.add_argument('--size', type=int, default=416, help="YOLOv3 input size")
+    parser.add_argument('--threads', type=int, default=4, help="TFLite threads")
+    parser.add_argument('--every', type=int, default=5, help="use every n-th frame")
+    parser.add_argument('--max-frames', type=int, default=200)
+    args = parser.parse_args()
+
+    frames = read_frames(args.clips, args.every, args.max_frames)
+    if not frames:
+        print("Error: Could not read any frames")
+        return
+    print(f"Benchmarking on {len(frames)} frames")
+
+    backends = list(dict.fromkeys([args.reference] + args.backends))
+    results = {}
+    for backend in backends:
+        detector = get_object_detector(backend, size=args.size, num_threads=args.threads)
+        results[backend] = run_backend(detector, frames)
+
+    reference = results[args.reference][0]
+    print(f"\n{'backend':<15}{'mean ms':>10}{'p95 ms':>10}{'person':>10}{'phone':>10}")
+    for backend in backends:
+        summaries, latencies = results[backend]
+        person_recall, phone_recall = recall(summaries, reference)
+        print(f"{backend:<15}{latencies.mean():>10.1f}{np.percentile(latencies, 95):>10.1f}"
+              f"{person_recall:>10.2f}{phone_recall:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Lightweight bounding box and label drawing with OpenCV
+
+Draws boxes straight onto the BGR frame with cv2. Label text is rendered
+once into a small sprite, cached by text and color and copied onto the frame
+on later calls, so steady detections cost a rectangle and an array copy.
+"""
+
+import cv2
+import numpy as np
+
+# BGR colors cycled by class id
+COLORS = [(255, 0, 0), (0, 0, 255), (0, 200, 0), (0, 165, 255), (255, 0, 255),
+          (255, 255, 0), (0, 255, 255), (128, 0, 128), (0, 128, 255), (128, 128, 0)]
+
+
+class BoxRenderer:
+    """
+    Draws boxes with cached label sprites
+
+    Parameters
+    ----------
+    thickness : int, optional
+        Line thickness of the boxes. The default is 2.
+    font_scale : float, optional
+        Scale of the label font. The default is 0.5.
+    text_color : tuple, optional
+        BGR color of the label text. The default is black.
+    max_sprites : int, optional
+        Number of cached label sprites before the cache is cleared. The
+        default is 1024.
+
+    """
+    def __init__(self, thickness=2, font_scale=0.5, text_color=(0, 0, 0), max_sprites=1024):
+        self.thickness = thickness
+        self.font_scale = font_scale
+        self.text_color = text_color
+        self.max_sprites = max_sprites
+        self.font = cv2.FONT_HERSHEY_SIMPLEX
+        self._sprites = {}
+
+    def label_sprite(self, text, color):
+        """
+        Label text on a filled background, rendered once per text and color
+
+        Parameters
+        ----------
+        text : string
+            Label text
+        color : tuple
+            BGR background color
+
+        Returns
+        -------
+        sprite : np.uint8
+            Image of the label
+
+        """
+        key = (text, color)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            if len(self._sprites) >= self.max_sprites:
+                self._sprites.clear()
+            (w, h), baseline = cv2.getTextSize(text, self.font, self.font_scale, 1)
+            sprite = np.empty((h + baseline + 4, w + 4, 3), dtype=np.uint8)
+            sprite[:] = color
+            cv2.putText(sprite, text, (2, h + 2), self.font, self.font_scale,
+                        self.text_color, 1, cv2.LINE_AA)
+            self._sprites[key] = sprite
+        return sprite
+
+    def draw(self, img, boxes, labels, class_ids=None, normalized=True):
+        """
+        Draw boxes and their labels on the image in place
+
+        Parameters
+        ----------
+        img : np.uint8
+            BGR image
+        boxes : np.array
+            Boxes as (x1, y1, x2, y2)
+        labels : list of string
+            Label of every box
+        class_ids : list of int, optional
+            Class of every box, picks its color. The default is None, which
+            colors every box the same.
+        normalized : bool, optional
+            Whether the boxes are normalized to [0, 1] or in pixels. The
+            default is True.
+
+        Returns
+        -------
+        img : np.uint8
+            The same image
+
+        """
+        height, width = img.shape[:2]
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        if normalized:
+            boxes = boxes * (width, height, width, height)
+        boxes = boxes.astype(np.int32)
+
+        for i, (x1, y1, x2, y2) in enumerate(boxes):
+            color = COLORS[int(class_ids[i]) % len(COLORS)] if class_ids is not None else COLORS[0]
+            cv2.rectangle(img, (int(x1), int(y1)), (int(x2), int(y2)), color, self.thickness)
+
+            sprite = self.label_sprite(labels[i], color)
+            h, w = sprite.shape[:2]
+            # above the box, or just inside it at the top of the frame
+            top = y1 - h if y1 - h >= 0 else max(y1, 0)
+            left = min(max(x1, 0), width - 1)
+            rows = min(h, height - top)
+            cols = min(w, width - left)
+            if rows > 0 and cols > 0:
+                img[top:top + rows, left:left + cols] = sprite[:rows, :cols]
+        return img
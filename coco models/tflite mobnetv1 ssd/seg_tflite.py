@@ -5,19 +5,39 @@ Created on Tue Aug 18 16:23:16 2020
 @author: hp
 """
 
+import os
+import sys
+import queue
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import tensorflow as tf
 import cv2
-import visualization_utils as vis_util
 
-def create_category_index(label_path='coco_ssd_mobilenet/labelmap.txt'):
+try:
+    # the small interpreter only package is enough for a TFLite model
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    import tensorflow as tf
+    Interpreter = tf.lite.Interpreter
+
+# Get the directory where this script is located
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(SCRIPT_DIR, 'coco_ssd_mobilenet', 'detect.tflite')
+LABEL_PATH = os.path.join(SCRIPT_DIR, 'coco_ssd_mobilenet', 'labelmap.txt')
+
+sys.path.append(os.path.dirname(os.path.dirname(SCRIPT_DIR)))
+from box_renderer import BoxRenderer
+
+renderer = BoxRenderer()
+
+def create_category_index(label_path=LABEL_PATH):
     """
     To create dictionary of label map
 
     Parameters
     ----------
     label_path : string, optional
-        Path to labelmap.txt. The default is 'coco_ssd_mobilenet/labelmap.txt'.
+        Path to labelmap.txt. The default is 'coco_ssd_mobilenet/labelmap.txt'
+        next to this script.
 
     Returns
     -------
@@ -100,98 +120,174 @@ def apply_nms(output_dict, iou_thresh=0.5, score_thresh=0.6):
             where N2 is the number of valid predictions after those conditions.
 
     """
-    q = 90 # no of classes
     num = int(output_dict['num_detections'])
-    boxes = np.zeros([1, num, q, 4])
-    scores = np.zeros([1, num, q])
-    # val = [0]*q
-    for i in range(num):
-        # indices = np.where(classes == output_dict['detection_classes'][i])[0][0]
-        boxes[0, i, output_dict['detection_classes'][i], :] = output_dict['detection_boxes'][i]
-        scores[0, i, output_dict['detection_classes'][i]] = output_dict['detection_scores'][i]
-    nmsd = tf.image.combined_non_max_suppression(boxes=boxes,
-                                                 scores=scores,
-                                                 max_output_size_per_class=num,
-                                                 max_total_size=num,
-                                                 iou_threshold=iou_thresh,
-                                                 score_threshold=score_thresh,
-                                                 pad_per_class=False,
-                                                 clip_boxes=False)
-    valid = nmsd.valid_detections[0].numpy()
+    boxes = output_dict['detection_boxes'][:num]
+    classes = output_dict['detection_classes'][:num]
+    scores = output_dict['detection_scores'][:num]
+
+    # candidates by descending score
+    order = np.flatnonzero(scores > score_thresh)
+    order = order[np.argsort(-scores[order], kind='stable')]
+    boxes, classes, scores = boxes[order], classes[order], scores[order]
+
+    # pairwise IoU of the candidates, only boxes of the same class suppress each other
+    y1, x1, y2, x2 = np.asarray(boxes, dtype=np.float32).T
+    ymin, ymax = np.minimum(y1, y2), np.maximum(y1, y2)
+    xmin, xmax = np.minimum(x1, x2), np.maximum(x1, x2)
+    areas = (ymax - ymin) * (xmax - xmin)
+    inter_h = np.clip(np.minimum(ymax[:, None], ymax) - np.maximum(ymin[:, None], ymin), 0, None)
+    inter_w = np.clip(np.minimum(xmax[:, None], xmax) - np.maximum(xmin[:, None], xmin), 0, None)
+    inter = inter_h * inter_w
+    union = areas[:, None] + areas - inter
+    with np.errstate(divide='ignore', invalid='ignore'):
+        iou = np.where(union > 0, inter / union, 0)
+    overlaps = (iou > iou_thresh) & (classes[:, None] == classes)
+
+    keep = np.ones(len(order), dtype=bool)
+    for i in range(len(order)):
+        if keep[i]:
+            keep[i + 1:] &= ~overlaps[i, i + 1:]
+
     output_dict = {
-                   'detection_boxes' : nmsd.nmsed_boxes[0].numpy()[:valid],
-                   'detection_classes' : nmsd.nmsed_classes[0].numpy().astype(np.int64)[:valid],
-                   'detection_scores' : nmsd.nmsed_scores[0].numpy()[:valid],
+                   'detection_boxes' : boxes[keep],
+                   'detection_classes' : classes[keep].astype(np.int64),
+                   'detection_scores' : scores[keep],
                    }
     return output_dict
 
-def make_and_show_inference(img, interpreter, input_details, output_details, category_index, nms=True, score_thresh=0.6, iou_thresh=0.5):
+class TFLiteDetector:
     """
-    Generate and draw inference on image
+    SSD-MobileNet detector backed by a pool of TFLite interpreters
+
+    An interpreter can only run one inference at a time, so every worker
+    thread checks one out of the pool for the duration of a frame. Several
+    camera streams can share a detector and run in parallel.
+
+    Parameters
+    ----------
+    model_path : string, optional
+        Path to the tflite model. The default is coco_ssd_mobilenet/detect.tflite.
+    pool_size : int, optional
+        Number of interpreters and worker threads. The default is 2.
+    num_threads : int, optional
+        Number of threads of each interpreter. The default is 2.
+    nms : bool, optional
+        To perform non-maximum suppression or not. The default is True.
+    iou_thresh : float, optional
+        Intersection Over Union Threshold. The default is 0.5.
+    score_thresh : float, optional
+        score above predicted class is accepted. The default is 0.6.
+
+    """
+    def __init__(self, model_path=MODEL_PATH, pool_size=2, num_threads=2, nms=True,
+                 iou_thresh=0.5, score_thresh=0.6):
+        self.nms = nms
+        self.iou_thresh = iou_thresh
+        self.score_thresh = score_thresh
+        self._interpreters = queue.Queue()
+        for _ in range(pool_size):
+            interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+            interpreter.allocate_tensors()
+            self._interpreters.put(interpreter)
+        self.input_details = interpreter.get_input_details()
+        self.output_details = interpreter.get_output_details()
+        _, self.height, self.width, _ = self.input_details[0]['shape']
+        self._executor = ThreadPoolExecutor(pool_size, thread_name_prefix='tflite-detector')
+
+    def detect_one(self, img):
+        """
+        Detect objects on one frame
+
+        Parameters
+        ----------
+        img : Array of uint8
+            BGR frame of any size
+
+        Returns
+        -------
+        output_dict : dict
+            Dictionary containing bounding boxes, classes and scores.
+
+        """
+        img_rgb = cv2.resize(img, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        img_rgb = cv2.cvtColor(img_rgb, cv2.COLOR_BGR2RGB)[np.newaxis]
+        interpreter = self._interpreters.get()
+        try:
+            interpreter.set_tensor(self.input_details[0]['index'], img_rgb)
+            interpreter.invoke()
+            return get_output_dict(img_rgb, interpreter, self.output_details, self.nms,
+                                   self.iou_thresh, self.score_thresh)
+        finally:
+            self._interpreters.put(interpreter)
+
+    def detect(self, frames):
+        """
+        Detect objects on frames in parallel
+
+        Parameters
+        ----------
+        frames : list of Array of uint8
+            BGR frames, e.g. the current frame of every camera stream
+
+        Returns
+        -------
+        output_dicts : list of dict
+            Output of ``detect_one`` for every frame, in order
+
+        """
+        if len(frames) == 1:
+            return [self.detect_one(frames[0])]
+        return list(self._executor.map(self.detect_one, frames))
+
+    def close(self):
+        """Stop the worker threads"""
+        self._executor.shutdown()
+
+def draw_inference(img, output_dict, category_index, score_thresh=0.6):
+    """
+    Draw detections on image
 
     Parameters
     ----------
     img : Array of uint8
-        Original Image to find predictions on.
-    interpreter : tensorflow.lite.python.interpreter.Interpreter
-        tflite model interpreter
-    input_details : list
-        input details of interpreter
-    output_details : list
-        output details of interpreter
+        Original Image the predictions were made on.
+    output_dict : dict
+        Output of ``TFLiteDetector.detect``
     category_index : dict
         dictionary of labels
-    nms : bool, optional
-        To perform non-maximum suppression or not. The default is True.
     score_thresh : int, optional
-        score above predicted class is accepted. The default is 0.6.
-    iou_thresh : int, optional
-        Intersection Over Union Threshold. The default is 0.5.
+        score above predicted class is drawn. The default is 0.6.
 
     Returns
     -------
-    NONE
+    img : Array of uint8
+        The same image with the detections drawn
     """
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    img_rgb = cv2.resize(img_rgb, (300, 300), cv2.INTER_AREA)
-    img_rgb = img_rgb.reshape([1, 300, 300, 3])
+    keep = output_dict['detection_scores'] >= score_thresh
+    classes = output_dict['detection_classes'][keep]
+    scores = output_dict['detection_scores'][keep]
+    # SSD boxes are (ymin, xmin, ymax, xmax)
+    boxes = output_dict['detection_boxes'][keep][:, [1, 0, 3, 2]]
+    labels = ['{}: {}%'.format(category_index.get(int(c), {'name': 'N/A'})['name'], int(100 * s))
+              for c, s in zip(classes, scores)]
+    return renderer.draw(img, boxes, labels, classes)
 
-    interpreter.set_tensor(input_details[0]['index'], img_rgb)
-    interpreter.invoke()
-    
-    output_dict = get_output_dict(img_rgb, interpreter, output_details, nms, iou_thresh, score_thresh)
-    # Visualization of the results of a detection.
-    vis_util.visualize_boxes_and_labels_on_image_array(
-    img,
-    output_dict['detection_boxes'],
-    output_dict['detection_classes'],
-    output_dict['detection_scores'],
-    category_index,
-    use_normalized_coordinates=True,
-    min_score_thresh=score_thresh,
-    line_thickness=3)
-
-# Load TFLite model and allocate tensors.
-interpreter = tf.lite.Interpreter(model_path="coco_ssd_mobilenet/detect.tflite")
-interpreter.allocate_tensors()
-
-# Get input and output tensors.
-input_details = interpreter.get_input_details()
-output_details = interpreter.get_output_details()
-
-category_index = create_category_index()
-input_shape = input_details[0]['shape']
-cap = cv2.VideoCapture(0)
-
-while(True):
-    ret, img = cap.read()
-    if ret:
-        make_and_show_inference(img, interpreter, input_details, output_details, category_index)
-        cv2.imshow("image", img)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+if __name__ == "__main__":
+    detector = TFLiteDetector(pool_size=1, num_threads=4)
+    category_index = create_category_index()
+    cap = cv2.VideoCapture(0)
+
+    while(True):
+        ret, img = cap.read()
+        if ret:
+            output_dict = detector.detect([img])[0]
+            draw_inference(img, output_dict, category_index)
+            cv2.imshow("image", img)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+        else:
             break
-    else:
-        break
     
-cap.release()
-cv2.destroyAllWindows()
+    cap.release()
+    cv2.destroyAllWindows()
+    detector.close()
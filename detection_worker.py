@@ -0,0 +1,95 @@
+"""
+Background object detection with latest-frame semantics
+
+Object detection is far slower than the rest of the per-frame pipeline.
+Running it inline every few frames makes frame times spike and the video
+stream stutter. ``DetectionWorker`` runs it on a dedicated thread instead:
+the frame loop submits every frame without waiting, the worker always takes
+the most recent one and drops older frames it did not get to, and publishes
+timestamped results which the loop reads without blocking.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+# value returned by the detect function, id of the frame it was computed on,
+# and time.monotonic() when that frame was submitted and when it finished
+DetectionResult = namedtuple('DetectionResult', ['value', 'frame_id', 'captured', 'completed'])
+
+
+class DetectionWorker:
+    """
+    Runs a detection function on the latest submitted frame in a thread
+
+    Parameters
+    ----------
+    detect : callable
+        Function taking a BGR frame, e.g. ``detect_objects``
+    name : string, optional
+        Name of the worker thread. The default is 'detection-worker'.
+
+    """
+    def __init__(self, detect, name='detection-worker'):
+        self.detect = detect
+        self.dropped = 0
+        self._condition = threading.Condition()
+        self._pending = None
+        self._frame_id = 0
+        self._result = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, frame):
+        """
+        Hand a frame to the worker without waiting for detection
+
+        The frame is copied, so the caller can keep drawing on it. A pending
+        frame the worker has not started on yet is replaced and dropped.
+
+        Parameters
+        ----------
+        frame : np.uint8
+            BGR frame
+
+        Returns
+        -------
+        frame_id : int
+            Id of the submitted frame
+
+        """
+        with self._condition:
+            if self._pending is not None:
+                self.dropped += 1
+            self._frame_id += 1
+            self._pending = (frame.copy(), self._frame_id, time.monotonic())
+            self._condition.notify()
+            return self._frame_id
+
+    def latest(self):
+        """Most recent DetectionResult, or None before the first one"""
+        return self._result
+
+    def stop(self):
+        """Stop the worker thread"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and self._pending is None:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                frame, frame_id, captured = self._pending
+                self._pending = None
+            try:
+                value = self.detect(frame)
+            except Exception as e:
+                print(f"Detection worker error: {e}")
+                continue
+            self._result = DetectionResult(value, frame_id, captured, time.monotonic())
@@ -65,7 +65,7 @@ def contouring(thresh, mid, img, end_points, right=False):
     mid : int
         The mid point between the eyes
     img : Array of uint8
-        Original Image
+        Original Image, the eyeball is drawn on it unless it is None
     end_points : list
         List containing the exteme points of eye
     right : boolean, optional
@@ -89,7 +89,8 @@ def contouring(thresh, mid, img, end_points, right=False):
         cy = int(M['m01']/M['m00'])
         if right:
             cx += mid
-        cv2.circle(img, (cx, cy), 4, (0, 0, 255), 2)
+        if img is not None:
+            cv2.circle(img, (cx, cy), 4, (0, 0, 255), 2)
         pos = find_eyeball_position(end_points, cx, cy)
         return pos
     except:
@@ -154,13 +155,51 @@ landmark_model = get_landmark_model()
 left = [36, 37, 38, 39, 40, 41]
 right = [42, 43, 44, 45, 46, 47]
 
-cv2.namedWindow("image")
 kernel = np.ones((9, 9), np.uint8)
 
 def nothing(x):
     pass
 
-cv2.createTrackbar("threshold", "image", 75, 255, nothing)
+def eye_gaze(img, shape, threshold=75, draw_img=None):
+    """
+    Find where the eyes of a face are looking
+
+    Parameters
+    ----------
+    img : Array of uint8
+        Image containing the face
+    shape : Array of uint32
+        Facial landmarks of the face
+    threshold : int, optional
+        Threshold separating the eyeballs from the whites. The default is 75.
+    draw_img : Array of uint8, optional
+        Image the eyeballs are drawn on. The default is None.
+
+    Returns
+    -------
+    eyeball_pos_left, eyeball_pos_right : int
+        Position of each eyeball as returned by ``contouring``, None if it
+        was not found
+    thresh : Array of uint8
+        Processed thresholded image of the eyes
+
+    """
+    mask = np.zeros(img.shape[:2], dtype=np.uint8)
+    mask, end_points_left = eye_on_mask(mask, left, shape)
+    mask, end_points_right = eye_on_mask(mask, right, shape)
+    mask = cv2.dilate(mask, kernel, 5)
+
+    eyes = cv2.bitwise_and(img, img, mask=mask)
+    mask = (eyes == [0, 0, 0]).all(axis=2)
+    eyes[mask] = [255, 255, 255]
+    mid = int((shape[42][0] + shape[39][0]) // 2)
+    eyes_gray = cv2.cvtColor(eyes, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(eyes_gray, threshold, 255, cv2.THRESH_BINARY)
+    thresh = process_thresh(thresh)
+
+    eyeball_pos_left = contouring(thresh[:, 0:mid], mid, draw_img, end_points_left)
+    eyeball_pos_right = contouring(thresh[:, mid:], mid, draw_img, end_points_right, True)
+    return eyeball_pos_left, eyeball_pos_right, thresh
 
 def track_eye(video_path=None):
 
@@ -182,6 +221,8 @@ def track_eye(video_path=None):
         return
     
     thresh = img.copy()
+    cv2.namedWindow("image")
+    cv2.createTrackbar("threshold", "image", 75, 255, nothing)
 
     print("Eye tracking started. Press 'q' to quit.")
     print("Make sure your face is visible to the camera.")
@@ -202,22 +243,8 @@ def track_eye(video_path=None):
         
         for rect in rects:
             shape = detect_marks(img, landmark_model, rect)
-            mask = np.zeros(img.shape[:2], dtype=np.uint8)
-            mask, end_points_left = eye_on_mask(mask, left, shape)
-            mask, end_points_right = eye_on_mask(mask, right, shape)
-            mask = cv2.dilate(mask, kernel, 5)
-            
-            eyes = cv2.bitwise_and(img, img, mask=mask)
-            mask = (eyes == [0, 0, 0]).all(axis=2)
-            eyes[mask] = [255, 255, 255]
-            mid = int((shape[42][0] + shape[39][0]) // 2)
-            eyes_gray = cv2.cvtColor(eyes, cv2.COLOR_BGR2GRAY)
             threshold = cv2.getTrackbarPos('threshold', 'image')
-            _, thresh = cv2.threshold(eyes_gray, threshold, 255, cv2.THRESH_BINARY)
-            thresh = process_thresh(thresh)
-            
-            eyeball_pos_left = contouring(thresh[:, 0:mid], mid, img, end_points_left)
-            eyeball_pos_right = contouring(thresh[:, mid:], mid, img, end_points_right, True)
+            eyeball_pos_left, eyeball_pos_right, thresh = eye_gaze(img, shape, threshold, img)
             print_eye_pos(img, eyeball_pos_left, eyeball_pos_right)
             # for (x, y) in shape[36:48]:
             #     cv2.circle(img, (x, y), 2, (255, 0, 0), -1)
@@ -1,8 +1,8 @@
 import numpy as np
 import cv2
-import joblib
 import os
 from face_detector import get_face_detector, find_faces
+from forest_inference import load_classifier
 
 # Get the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -29,61 +29,136 @@ def calc_hist(img):
         histogram[j] = histr
     return np.array(histogram)
 
-face_model = get_face_detector()
-clf = joblib.load(os.path.join(SCRIPT_DIR, 'models/face_spoofing.pkl'))
-cap = cv2.VideoCapture(0)
+class HistogramFeatureExtractor:
+    """
+    Fused YCrCb + LUV histogram features for the face spoofing classifier.
 
-sample_number = 1
-count = 0
-measures = np.zeros(sample_number, dtype=np.float)
+    Produces the same 1536 values as concatenating ``calc_hist`` of the
+    YCrCb and LUV conversions of a face ROI, but downsamples the ROI to a
+    fixed size first, converts colour spaces into preallocated buffers and
+    counts all six channels with a single ``np.bincount``. The returned
+    feature row is reused between calls, so copy it if it has to be kept.
 
-while True:
-    ret, img = cap.read()
-    faces = find_faces(img, face_model)
+    Parameters
+    ----------
+    size : tuple of int or None, optional
+        (width, height) the ROI is resized to before computing histograms.
+        None keeps the ROI at full resolution, which matches ``calc_hist``
+        exactly. The default is (64, 64).
 
-    measures[count%sample_number]=0
-    height, width = img.shape[:2]
-    for x, y, x1, y1 in faces:
-        
-        roi = img[y:y1, x:x1]
-        point = (0,0)
+    """
+    n_bins = 256
+    n_channels = 6
+
+    def __init__(self, size=(64, 64)):
+        self.size = size
+        self.feature = np.zeros((1, self.n_channels * self.n_bins), dtype=np.float32)
+        self._hist = self.feature.reshape(self.n_channels, self.n_bins)
+        self._offsets = np.arange(self.n_channels, dtype=np.intp) * self.n_bins
+        self._shape = None
+        if size is not None:
+            self._allocate(size[1], size[0])
+
+    def _allocate(self, height, width):
+        self._shape = (height, width)
+        self._roi = np.empty((height, width, 3), dtype=np.uint8)
+        self._ycrcb = np.empty((height, width, 3), dtype=np.uint8)
+        self._luv = np.empty((height, width, 3), dtype=np.uint8)
+        self._index = np.empty((height, width, self.n_channels), dtype=np.intp)
+
+    def __call__(self, roi):
+        """
+        Calculate the feature vector of a face ROI
+
+        Parameters
+        ----------
+        roi : Array of uint8
+            BGR face region
+
+        Returns
+        -------
+        feature : np.array
+            Feature row of shape (1, 1536) ready for ``predict_proba``
+
+        """
+        if self.size is None:
+            if self._shape != roi.shape[:2]:
+                self._allocate(*roi.shape[:2])
+            src = roi
+        else:
+            cv2.resize(roi, self.size, dst=self._roi, interpolation=cv2.INTER_AREA)
+            src = self._roi
+
+        cv2.cvtColor(src, cv2.COLOR_BGR2YCR_CB, dst=self._ycrcb)
+        cv2.cvtColor(src, cv2.COLOR_BGR2LUV, dst=self._luv)
+        # shift every channel into its own block of bins so a single
+        # bincount yields all six histograms back to back
+        np.add(self._ycrcb, self._offsets[:3], out=self._index[..., :3])
+        np.add(self._luv, self._offsets[3:], out=self._index[..., 3:])
+        counts = np.bincount(self._index.ravel(),
+                             minlength=self.n_channels * self.n_bins)
+        np.copyto(self._hist, counts.reshape(self.n_channels, self.n_bins),
+                  casting='unsafe')
+        self._hist *= 255.0 / self._hist.max(axis=1, keepdims=True)
+        return self.feature
+
+def detect_spoofing(video_path=None):
+    # Use webcam if no video path provided
+    if video_path is None or video_path == "":
+        video_path = 0
+
+    face_model = get_face_detector()
+    clf = load_classifier()
+    extractor = HistogramFeatureExtractor()
+    cap = cv2.VideoCapture(video_path)
+
+    sample_number = 1
+    count = 0
+    measures = np.zeros(sample_number, dtype=float)
+
+    while True:
+        ret, img = cap.read()
+        faces = find_faces(img, face_model)
+
+        measures[count%sample_number]=0
+        height, width = img.shape[:2]
+        for x, y, x1, y1 in faces:
+            
+            roi = img[y:y1, x:x1]
+            point = (0,0)
+
+            feature_vector = extractor(roi)
+
+            prediction = clf.predict_proba(feature_vector)
+            prob = prediction[0][1]
+
+            measures[count % sample_number] = prob
+
+            cv2.rectangle(img, (x, y), (x1, y1), (255, 0, 0), 2)
+
+            point = (x, y-5)
+
+            # print (measures, np.mean(measures))
+            if 0 not in measures:
+                text = "True"
+                if np.mean(measures) >= 0.7:
+                    text = "False"
+                    font = cv2.FONT_HERSHEY_SIMPLEX
+                    cv2.putText(img=img, text=text, org=point, fontFace=font, fontScale=0.9, color=(0, 0, 255),
+                                thickness=2, lineType=cv2.LINE_AA)
+                else:
+                    font = cv2.FONT_HERSHEY_SIMPLEX
+                    cv2.putText(img=img, text=text, org=point, fontFace=font, fontScale=0.9,
+                                color=(0, 255, 0), thickness=2, lineType=cv2.LINE_AA)
+            
+        count+=1
+        cv2.imshow('img_rgb', img)
         
-        img_ycrcb = cv2.cvtColor(roi, cv2.COLOR_BGR2YCR_CB)
-        img_luv = cv2.cvtColor(roi, cv2.COLOR_BGR2LUV)
-
-        ycrcb_hist = calc_hist(img_ycrcb)
-        luv_hist = calc_hist(img_luv)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
 
-        feature_vector = np.append(ycrcb_hist.ravel(), luv_hist.ravel())
-        feature_vector = feature_vector.reshape(1, len(feature_vector))
+    cap.release()
+    cv2.destroyAllWindows()
 
-        prediction = clf.predict_proba(feature_vector)
-        prob = prediction[0][1]
-
-        measures[count % sample_number] = prob
-
-        cv2.rectangle(img, (x, y), (x1, y1), (255, 0, 0), 2)
-
-        point = (x, y-5)
-
-        # print (measures, np.mean(measures))
-        if 0 not in measures:
-            text = "True"
-            if np.mean(measures) >= 0.7:
-                text = "False"
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                cv2.putText(img=img, text=text, org=point, fontFace=font, fontScale=0.9, color=(0, 0, 255),
-                            thickness=2, lineType=cv2.LINE_AA)
-            else:
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                cv2.putText(img=img, text=text, org=point, fontFace=font, fontScale=0.9,
-                            color=(0, 255, 0), thickness=2, lineType=cv2.LINE_AA)
-        
-    count+=1
-    cv2.imshow('img_rgb', img)
-    
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
-
-cap.release()
-cv2.destroyAllWindows()
+if __name__ == "__main__":
+    detect_spoofing()
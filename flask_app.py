@@ -21,14 +21,17 @@ from face_detector import get_face_detector, find_faces
 from face_landmarks import get_landmark_model, detect_marks
 from eye_tracker import eye_on_mask, find_eyeball_position, contouring, process_thresh
 
-# Import YOLO with error handling (it has Lambda layer issues)
+from object_detector import get_object_detector, count_objects, PHONE, LAPTOP
+from detection_worker import DetectionWorker
+
+# Load the object detector with error handling (YOLO has Lambda layer issues)
 try:
-    from person_and_phone import yolo
+    object_detector = get_object_detector(size=416)  # Higher resolution for better accuracy
     YOLO_AVAILABLE = True
 except Exception as e:
-    print(f"Warning: YOLO not available: {e}")
+    print(f"Warning: Object detector not available: {e}")
     YOLO_AVAILABLE = False
-    yolo = None
+    object_detector = None
 
 print("Loading AI models for Flask dashboard...")
 
@@ -275,45 +278,26 @@ def detect_head_pose(img, marks, camera_matrix):
         return "Not Detected"
 
 def detect_objects(img):
-    """Detect persons and phones using YOLO with high accuracy"""
+    """Detect persons and phones with the configured object detector"""
     if not YOLO_AVAILABLE:
         return 1, False  # Default: assume 1 person, no phone
     
     try:
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        img_resized = cv2.resize(img_rgb, (416, 416))  # Higher resolution for better accuracy
-        img_normalized = np.expand_dims(img_resized.astype(np.float32) / 255.0, 0)
-        
-        boxes, scores, classes, nums = yolo(img_normalized)
-        
-        person_count = 0
-        phone_detected = False
-        confidence_threshold = 0.6  # Higher threshold for better accuracy
-        
-        for i in range(nums[0]):
-            score = float(scores[0][i])
-            if score < confidence_threshold:
-                continue
-                
-            class_id = int(classes[0][i])
-            
-            # COCO dataset: 0 = person
-            if class_id == 0:
-                person_count += 1
-            
-            # COCO dataset: 67 = cell phone, 73 = laptop (also monitor for cheating)
-            if class_id in [67, 73]:
-                phone_detected = True
-        
-        return person_count, phone_detected
+        detections = object_detector.detect(img)
+        # Laptops are also reported as a forbidden device (monitor for cheating)
+        return count_objects(detections, device_labels=(PHONE, LAPTOP))
     except Exception as e:
-        print(f"YOLO detection error: {e}")
+        print(f"Object detection error: {e}")
         return 1, False  # Default: assume 1 person, no phone
 
 
+# Object detection runs in the background on the most recent frame
+object_worker = DetectionWorker(detect_objects, name='object-detection')
+
 def generate_frames():
     """Generate video frames with detections"""
     frame_count = 0
+    last_result_id = None
     
     while dashboard_state.is_monitoring:
         success, frame = dashboard_state.camera.read()
@@ -321,6 +305,9 @@ def generate_frames():
         if not success:
             break
         
+        # Hand the clean frame to object detection before drawing on it
+        object_worker.submit(frame)
+        
         # Reset status
         dashboard_state.reset_status()
         
@@ -365,15 +352,18 @@ def generate_frames():
         else:
             dashboard_state.detection_history['face'].append(False)
         
-        # Object detection (every 3 frames for better performance)
-        if frame_count % 3 == 0:
-            person_count, phone_detected = detect_objects(frame)
-            dashboard_state.status['person_count'] = person_count
-            dashboard_state.status['phone_detected'] = phone_detected
-            
-            # Add multi-frame validation
-            dashboard_state.detection_history['phone'].append(phone_detected)
-            dashboard_state.detection_history['person_count'].append(person_count)
+        # Object detection results from the background worker (never waits)
+        result = object_worker.latest()
+        if result is not None:
+            person_count, phone_detected = result.value
+            if result.frame_id != last_result_id:
+                last_result_id = result.frame_id
+                dashboard_state.status['person_count'] = person_count
+                dashboard_state.status['phone_detected'] = phone_detected
+                
+                # Add multi-frame validation
+                dashboard_state.detection_history['phone'].append(phone_detected)
+                dashboard_state.detection_history['person_count'].append(person_count)
             
             # Display detection results
             cv2.putText(frame, f"Persons: {person_count}", 
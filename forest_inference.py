@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Pure NumPy inference for the tree ensemble used by face spoofing detection.
+
+The fitted scikit-learn estimator in models/face_spoofing.pkl is flattened
+once into plain node arrays stored in an uncompressed .npz file. Loading
+that file memory-maps every array, so forked workers share the same pages
+and scikit-learn is not needed at runtime.
+
+Export with:
+    python forest_inference.py [models/face_spoofing.pkl] [models/face_spoofing.npz]
+"""
+
+import os
+import struct
+import sys
+import zipfile
+import numpy as np
+
+# Get the directory where this script is located
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_PKL = os.path.join(SCRIPT_DIR, 'models/face_spoofing.pkl')
+DEFAULT_NPZ = os.path.join(SCRIPT_DIR, 'models/face_spoofing.npz')
+
+_TREE_LEAF = -1
+
+def export_forest(clf, path=DEFAULT_NPZ):
+    """
+    Flatten a fitted tree classifier into NumPy arrays and save them
+
+    Parameters
+    ----------
+    clf : sklearn classifier
+        Fitted ExtraTreesClassifier, RandomForestClassifier or
+        DecisionTreeClassifier with a single output.
+    path : string, optional
+        Destination .npz file. The default is 'models/face_spoofing.npz'.
+
+    Returns
+    -------
+    None.
+
+    """
+    estimators = getattr(clf, 'estimators_', [clf])
+    left, right, feature, threshold, value, roots = [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+    for est in estimators:
+        tree = est.tree_
+        n = tree.node_count
+        node_ids = np.arange(offset, offset + n)
+        is_leaf = tree.children_left == _TREE_LEAF
+        # leaves point at themselves and always go left, so every sample
+        # can be walked for max_depth steps without branching on leaves
+        left.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+        right.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        counts = tree.value[:, 0, :]
+        value.append(counts / counts.sum(axis=1, keepdims=True))
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n
+
+    np.savez(path,
+             children_left=np.concatenate(left).astype(np.int32),
+             children_right=np.concatenate(right).astype(np.int32),
+             feature=np.concatenate(feature).astype(np.int32),
+             threshold=np.concatenate(threshold).astype(np.float64),
+             value=np.concatenate(value).astype(np.float64),
+             roots=np.array(roots, dtype=np.int32),
+             classes=np.asarray(clf.classes_),
+             max_depth=np.array(max_depth, dtype=np.int32))
+
+def _load_npz(path, mmap_mode='r'):
+    """Open every member of an uncompressed .npz as a memory-mapped array."""
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as f:
+        for info in zf.infolist():
+            name = info.filename[:-len('.npy')]
+            if mmap_mode is None or info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(zf.open(info))
+                continue
+            # skip the local file header to reach the raw .npy bytes
+            f.seek(info.header_offset)
+            header = f.read(30)
+            name_len, extra_len = struct.unpack('<HH', header[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            if shape == ():
+                arrays[name] = np.fromfile(f, dtype=dtype, count=1)[0]
+                continue
+            arrays[name] = np.memmap(path, dtype=dtype, mode=mmap_mode,
+                                     offset=f.tell(), shape=shape,
+                                     order='F' if fortran else 'C')
+    return arrays
+
+class ForestClassifier:
+    """
+    Tree ensemble evaluated with NumPy only
+
+    Parameters
+    ----------
+    path : string, optional
+        Path to the .npz written by ``export_forest``. The default is
+        'models/face_spoofing.npz'.
+    mmap_mode : string or None, optional
+        Memory-map mode for the node arrays. The default is 'r'.
+
+    """
+    def __init__(self, path=DEFAULT_NPZ, mmap_mode='r'):
+        arrays = _load_npz(path, mmap_mode)
+        self.children_left = arrays['children_left']
+        self.children_right = arrays['children_right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.classes_ = np.asarray(arrays['classes'])
+        self.max_depth = int(arrays['max_depth'])
+
+    def predict_proba(self, X):
+        """
+        Predict class probabilities, averaged over all trees
+
+        Parameters
+        ----------
+        X : array-like
+            Feature matrix of shape (n_samples, n_features)
+
+        Returns
+        -------
+        proba : np.array
+            Class probabilities of shape (n_samples, n_classes)
+
+        """
+        # sklearn evaluates trees on float32 features
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.repeat(self.roots[None, :], X.shape[0], axis=0)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.children_left[node],
+                            self.children_right[node])
+        return self.value[node].mean(axis=1)
+
+    def predict(self, X):
+        """Predict the most probable class of every sample."""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+def _load_legacy_pickle(path):
+    """
+    Load a pickle written by scikit-learn 0.19 with a current scikit-learn.
+
+    Module paths are aliased to their new locations and tree node arrays
+    are padded with the fields added since then.
+    """
+    import joblib
+    from joblib import numpy_pickle
+    from sklearn.ensemble import _forest
+    from sklearn.tree import _classes, _tree
+
+    sys.modules.setdefault('sklearn.ensemble.forest', _forest)
+    sys.modules.setdefault('sklearn.tree.tree', _classes)
+    sys.modules.setdefault('sklearn.externals.joblib', joblib)
+    sys.modules.setdefault('sklearn.externals.joblib.numpy_pickle', numpy_pickle)
+
+    class LegacyUnpickler(numpy_pickle.NumpyUnpickler):
+        dispatch = numpy_pickle.NumpyUnpickler.dispatch.copy()
+
+        def load_build(self):
+            state, inst = self.stack[-1], self.stack[-2]
+            if isinstance(inst, _tree.Tree) and isinstance(state, dict):
+                nodes = state['nodes']
+                node_dtype = np.dtype(_tree.NODE_DTYPE)
+                if nodes.dtype != node_dtype:
+                    padded = np.zeros(nodes.shape, dtype=node_dtype)
+                    for name in nodes.dtype.names:
+                        padded[name] = nodes[name]
+                    state['nodes'] = padded
+            numpy_pickle.NumpyUnpickler.load_build(self)
+
+        dispatch[ord('b')] = load_build
+
+    with open(path, 'rb') as f:
+        return LegacyUnpickler(path, f, True).load()
+
+def load_classifier(npz_path=DEFAULT_NPZ, pkl_path=DEFAULT_PKL):
+    """
+    Get the face spoofing classifier, preferring the exported NumPy model
+
+    Parameters
+    ----------
+    npz_path : string, optional
+        Exported model. The default is 'models/face_spoofing.npz'.
+    pkl_path : string, optional
+        Pickled scikit-learn model used when no export exists. The default
+        is 'models/face_spoofing.pkl'.
+
+    Returns
+    -------
+    clf : object with predict_proba
+
+    """
+    if os.path.exists(npz_path):
+        return ForestClassifier(npz_path)
+    import joblib
+    return joblib.load(pkl_path)
+
+if __name__ == '__main__':
+    pkl_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PKL
+    npz_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_NPZ
+    try:
+        import joblib
+        clf = joblib.load(pkl_path)
+    except (ImportError, ValueError):
+        clf = _load_legacy_pickle(pkl_path)
+    export_forest(clf, npz_path)
+    print("Exported {} trees to {}".format(
+        len(getattr(clf, 'estimators_', [clf])), npz_path))
@@ -128,6 +128,8 @@ face_model = get_face_detector()
 landmark_model = get_landmark_model()
 
 font = cv2.FONT_HERSHEY_SIMPLEX 
+# UPNP ran EPNP in OpenCV 4 and is gone from OpenCV 5
+SOLVEPNP_FLAG = getattr(cv2, 'SOLVEPNP_UPNP', cv2.SOLVEPNP_EPNP)
 # 3D model points.
 model_points = np.array([
                             (0.0, 0.0, 0.0),             # Nose tip
@@ -138,6 +140,74 @@ model_points = np.array([
                             (150.0, -150.0, -125.0)      # Right mouth corner
                         ])
 
+def get_camera_matrix(size):
+    """Approximate camera matrix of an image size, focal length of the image width"""
+    focal_length = size[1]
+    center = (size[1]/2, size[0]/2)
+    return np.array(
+                    [[focal_length, 0, center[0]],
+                    [0, focal_length, center[1]],
+                    [0, 0, 1]], dtype = "double"
+                    )
+
+def head_pose_angles(img, marks, camera_matrix):
+    """
+    Estimate the up-down and sideways angles of a head
+
+    Parameters
+    ----------
+    img : np.unit8
+        Original Image.
+    marks : Array of uint32
+        Facial landmarks of the face
+    camera_matrix : Array of float64
+        The camera matrix
+
+    Returns
+    -------
+    ang1 : int
+        Up-down angle, 48 or more is down and -48 or less up
+    ang2 : int
+        Sideways angle, 48 or more is right and -48 or less left
+    image_points : Array of float64
+        Landmarks the pose was estimated from
+    lines : tuple
+        End points p1, p2 of the line out of the nose and x1, x2 of the
+        sideways line
+
+    """
+    image_points = np.array([
+                            marks[30],     # Nose tip
+                            marks[8],     # Chin
+                            marks[36],     # Left eye left corner
+                            marks[45],     # Right eye right corne
+                            marks[48],     # Left Mouth corner
+                            marks[54]      # Right mouth corner
+                        ], dtype="double")
+    dist_coeffs = np.zeros((4,1)) # Assuming no lens distortion
+    (success, rotation_vector, translation_vector) = cv2.solvePnP(model_points, image_points, camera_matrix, dist_coeffs, flags=SOLVEPNP_FLAG)
+
+    # Project a 3D point (0, 0, 1000.0) onto the image plane.
+    # We use this to draw a line sticking out of the nose
+    (nose_end_point2D, jacobian) = cv2.projectPoints(np.array([(0.0, 0.0, 1000.0)]), rotation_vector, translation_vector, camera_matrix, dist_coeffs)
+
+    p1 = ( int(image_points[0][0]), int(image_points[0][1]))
+    p2 = ( int(nose_end_point2D[0][0][0]), int(nose_end_point2D[0][0][1]))
+    x1, x2 = head_pose_points(img, rotation_vector, translation_vector, camera_matrix)
+
+    try:
+        m = (p2[1] - p1[1])/(p2[0] - p1[0])
+        ang1 = int(math.degrees(math.atan(m)))
+    except:
+        ang1 = 90
+
+    try:
+        m = (x2[1] - x1[1])/(x2[0] - x1[0])
+        ang2 = int(math.degrees(math.atan(-1/m)))
+    except:
+        ang2 = 90
+    return ang1, ang2, image_points, (p1, p2, x1, x2)
+
 def detect_head_pose(video_path):
     # Use webcam if no video path provided
     if video_path is None or video_path == "":
@@ -163,13 +233,7 @@ def detect_head_pose(video_path):
     size = img.shape
 
     # Camera internals
-    focal_length = size[1]
-    center = (size[1]/2, size[0]/2)
-    camera_matrix = np.array(
-                            [[focal_length, 0, center[0]],
-                            [0, focal_length, center[1]],
-                            [0, 0, 1]], dtype = "double"
-                            )
+    camera_matrix = get_camera_matrix(size)
     
     print("Head pose detection started. Press 'q' to quit.")
     print("Keep your face visible to the camera.")
@@ -189,49 +253,13 @@ def detect_head_pose(video_path):
         for face in faces:
                 marks = detect_marks(img, landmark_model, face)
                 # mark_detector.draw_marks(img, marks, color=(0, 255, 0))
-                image_points = np.array([
-                                        marks[30],     # Nose tip
-                                        marks[8],     # Chin
-                                        marks[36],     # Left eye left corner
-                                        marks[45],     # Right eye right corne
-                                        marks[48],     # Left Mouth corner
-                                        marks[54]      # Right mouth corner
-                                    ], dtype="double")
-                dist_coeffs = np.zeros((4,1)) # Assuming no lens distortion
-                (success, rotation_vector, translation_vector) = cv2.solvePnP(model_points, image_points, camera_matrix, dist_coeffs, flags=cv2.SOLVEPNP_UPNP)
-                
-                
-                # Project a 3D point (0, 0, 1000.0) onto the image plane.
-                # We use this to draw a line sticking out of the nose
-                
-                (nose_end_point2D, jacobian) = cv2.projectPoints(np.array([(0.0, 0.0, 1000.0)]), rotation_vector, translation_vector, camera_matrix, dist_coeffs)
-                
+                ang1, ang2, image_points, (p1, p2, x1, x2) = head_pose_angles(img, marks, camera_matrix)
+
                 for p in image_points:
                     cv2.circle(img, (int(p[0]), int(p[1])), 3, (0,0,255), -1)
-                
-                
-                p1 = ( int(image_points[0][0]), int(image_points[0][1]))
-                p2 = ( int(nose_end_point2D[0][0][0]), int(nose_end_point2D[0][0][1]))
-                x1, x2 = head_pose_points(img, rotation_vector, translation_vector, camera_matrix)
 
                 cv2.line(img, p1, p2, (0, 255, 255), 2)
                 cv2.line(img, tuple(x1), tuple(x2), (255, 255, 0), 2)
-                # for (x, y) in marks:
-                #     cv2.circle(img, (x, y), 4, (255, 255, 0), -1)
-                # cv2.putText(img, str(p1), p1, font, 1, (0, 255, 255), 1)
-                try:
-                    m = (p2[1] - p1[1])/(p2[0] - p1[0])
-                    ang1 = int(math.degrees(math.atan(m)))
-                except:
-                    ang1 = 90
-                    
-                try:
-                    m = (x2[1] - x1[1])/(x2[0] - x1[0])
-                    ang2 = int(math.degrees(math.atan(-1/m)))
-                except:
-                    ang2 = 90
-                    
-                    # print('div by zero error')
                 if ang1 >= 48:
                     print('Head down')
                     cv2.putText(img, 'Head down', (30, 30), font, 2, (255, 255, 128), 3)
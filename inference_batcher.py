@@ -0,0 +1,183 @@
+"""
+Cross-stream micro-batching for object detection
+
+When one process monitors several candidates every stream would call the
+detector with a batch of one. ``MicroBatcher`` sits in front of the model:
+it collects preprocessed inputs from many callers for up to ``max_wait_ms``
+or ``max_batch_size`` inputs, runs one batched forward pass on a worker
+thread and hands every caller its slice of the outputs through a future.
+Inputs of different shapes or dtypes, e.g. from detectors at 320 and 416,
+are run as separate forward passes of the same batch.
+
+It is a drop-in replacement for the model of ``YoloV3Detector``:
+    batcher = MicroBatcher(CompiledYolo(sizes=(416,), uint8_input=True))
+    detector = YoloV3Detector(size=416, model=batcher)
+"""
+
+import threading
+import time
+import queue
+from concurrent.futures import Future
+import numpy as np
+
+
+class Histogram:
+    """
+    Thread-safe histogram with fixed bucket upper bounds
+
+    Parameters
+    ----------
+    buckets : tuple of float
+        Increasing upper bounds of the buckets. Larger values are counted
+        in an overflow bucket.
+
+    """
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.total = 0.0
+
+    def observe(self, value):
+        index = np.searchsorted(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+
+    def snapshot(self):
+        """Counts per bucket, keyed by upper bound, with count and mean"""
+        with self.lock:
+            labels = [str(b) for b in self.buckets] + ['inf']
+            return {
+                'buckets': dict(zip(labels, self.counts)),
+                'count': self.count,
+                'mean': self.total / self.count if self.count else 0.0
+            }
+
+
+class MicroBatcher:
+    """
+    Collects inputs from many callers and runs them as one batch
+
+    Parameters
+    ----------
+    infer : callable
+        Takes an array of shape (n, ...) and returns a sequence of outputs
+        whose first axis is the batch, e.g. ``CompiledYolo``.
+    max_batch_size : int, optional
+        Maximum number of inputs in one batch. The default is 8.
+    max_wait_ms : float, optional
+        How long the first input of a batch waits for others. The default is 5.
+
+    """
+    def __init__(self, infer, max_batch_size=8, max_wait_ms=5):
+        self.infer = infer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batch_sizes = Histogram((1, 2, 4, 8, 16, 32))
+        self.wait_times = Histogram((0.5, 1, 2, 5, 10, 20, 50, 100))  # ms
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()  # no input is queued behind the sentinel
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, img):
+        """
+        Queue an input for the next batch
+
+        Parameters
+        ----------
+        img : np.array
+            Input with a leading batch axis, usually of size one
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Resolves to the outputs for this input, batch axis kept
+
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._queue.put((np.asarray(img), future, time.perf_counter()))
+        return future
+
+    def __call__(self, img):
+        return self.submit(img).result()
+
+    def stats(self):
+        """Batch size and queue wait time histograms"""
+        return {
+            'batch_size': self.batch_sizes.snapshot(),
+            'wait_ms': self.wait_times.snapshot()
+        }
+
+    def close(self):
+        """Stop the worker after the queued inputs are processed"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        """Block for the first input, then gather more until full or timed out"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # let the next _collect stop the worker
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            groups = {}
+            for item in batch:
+                img = item[0]
+                groups.setdefault((img.shape[1:], img.dtype.str), []).append(item)
+            for group in groups.values():
+                self._infer(group)
+
+    def _infer(self, group):
+        """One forward pass over inputs of the same shape and dtype"""
+        start = time.perf_counter()
+        inputs = [item[0] for item in group]
+        try:
+            outputs = self.infer(np.concatenate(inputs, axis=0))
+            outputs = [np.asarray(o) for o in outputs]
+        except Exception as e:
+            for _, future, _ in group:
+                future.set_exception(e)
+            return
+
+        self.batch_sizes.observe(sum(img.shape[0] for img in inputs))
+        offset = 0
+        for img, future, queued in group:
+            n = img.shape[0]
+            self.wait_times.observe((start - queued) * 1000)
+            future.set_result(tuple(o[offset:offset + n] for o in outputs))
+            offset += n
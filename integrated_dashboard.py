@@ -23,8 +23,10 @@ print("Loading AI models... This may take a moment...")
 face_model = get_face_detector()
 landmark_model = get_landmark_model()
 
-# Import YOLOv3 for person and phone detection
-from person_and_phone import yolo
+# Object detector (YOLOv3 or SSD-MobileNet) for person and phone detection
+from object_detector import get_object_detector, count_objects
+from detection_worker import DetectionWorker
+object_detector = get_object_detector(size=320)
 
 # Import eye tracking utilities
 from eye_tracker import eye_on_mask, find_eyeball_position, contouring, process_thresh
@@ -75,6 +77,9 @@ class ProctoringDashboard:
         # Detection status
         self.reset_status()
         
+        # Person and phone detection runs in the background on the latest frame
+        self.object_worker = DetectionWorker(self.detect_objects, name='object-detection')
+        
         # Load class names for YOLO
         self.class_names = [c.strip() for c in open(
             os.path.join(SCRIPT_DIR, "models/classes.TXT")
@@ -173,26 +178,9 @@ class ProctoringDashboard:
             return "Not Detected"
     
     def detect_objects(self, img):
-        """Detect persons and phones using YOLO"""
+        """Detect persons and phones with the configured object detector"""
         try:
-            # Prepare image for YOLO
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            img_resized = cv2.resize(img_rgb, (320, 320))
-            img_normalized = np.expand_dims(img_resized.astype(np.float32) / 255, 0)
-            
-            # Run YOLO detection
-            boxes, scores, classes, nums = yolo(img_normalized)
-            
-            person_count = 0
-            phone_detected = False
-            
-            for i in range(nums[0]):
-                if int(classes[0][i]) == 0:  # Person class
-                    person_count += 1
-                if int(classes[0][i]) == 67:  # Cell phone class
-                    phone_detected = True
-            
-            return person_count, phone_detected
+            return count_objects(object_detector.detect(img))
         except:
             return 0, False
     
@@ -323,6 +311,9 @@ class ProctoringDashboard:
                 print("Error: Lost camera connection")
                 break
             
+            # Hand the clean frame to object detection before drawing on it
+            self.object_worker.submit(frame)
+            
             # Reset status for this frame
             self.reset_status()
             
@@ -350,9 +341,10 @@ class ProctoringDashboard:
                     # Head pose detection
                     self.head_status = self.detect_head_pose(frame, marks)
             
-            # Person and phone detection (every 5 frames to improve performance)
-            if frame_count % 5 == 0:
-                self.person_count, self.phone_detected = self.detect_objects(frame)
+            # Latest person and phone detection result (never waits)
+            result = self.object_worker.latest()
+            if result is not None:
+                self.person_count, self.phone_detected = result.value
             
             # Update alert level
             self.update_alert_level()
@@ -382,6 +374,7 @@ class ProctoringDashboard:
             frame_count += 1
         
         # Cleanup
+        self.object_worker.stop()
         self.cap.release()
         cv2.destroyAllWindows()
         print("Dashboard closed.")
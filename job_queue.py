@@ -0,0 +1,208 @@
+"""
+Background video analysis jobs on a bounded pool of worker processes
+
+``JobQueue.submit`` returns a job id right away and the job runs
+``video_job.analyze_video`` on one of a fixed number of worker processes.
+Every worker loads the face, landmark and object detection models once when
+it starts, so jobs do not pay for them. Workers report their progress back
+over a multiprocessing queue, and ``JobQueue.get`` returns the status,
+progress and, once done, the result of a job. At most ``max_queued`` jobs
+wait for a worker; more are refused with ``QueueFull`` instead of piling up.
+"""
+
+import os
+import time
+import uuid
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# progress queue and preloaded object detector of a worker process
+_progress = None
+_detector = None
+
+
+class QueueFull(Exception):
+    """Raised by ``JobQueue.submit`` when max_queued jobs are waiting"""
+
+
+def _init_worker(progress, preload_objects, object_backend):
+    global _progress, _detector
+    _progress = progress
+    import video_job
+    video_job.warm_up()
+    if preload_objects:
+        from object_detector import get_object_detector
+        _detector = get_object_detector(object_backend, size=320)
+
+
+def _run_job(job_id, video_path, options):
+    import video_job
+    _progress.put((job_id, 0, None))
+    return video_job.analyze_video(
+        video_path, object_detector=_detector,
+        on_progress=lambda decoded, total: _progress.put((job_id, decoded, total)), **options)
+
+
+class JobQueue:
+    """
+    Runs video analysis jobs on worker processes
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of worker processes. The default is the value of the
+        PROCTORING_WORKERS environment variable or 2.
+    max_queued : int, optional
+        Jobs waiting for a worker before ``submit`` refuses more. The
+        default is the value of the PROCTORING_MAX_QUEUED environment
+        variable or 8.
+    max_finished : int, optional
+        Finished jobs kept for ``get``, the oldest are forgotten. The
+        default is 100.
+    preload_objects : bool, optional
+        Whether the workers load the object detector at start. The default
+        is True.
+    object_backend : string, optional
+        object_detector backend. The default is the value of the
+        PROCTORING_DETECTOR environment variable or 'yolov3'.
+
+    """
+    def __init__(self, workers=None, max_queued=None, max_finished=100, preload_objects=True,
+                 object_backend=None):
+        if workers is None:
+            workers = int(os.environ.get('PROCTORING_WORKERS', 2))
+        if max_queued is None:
+            max_queued = int(os.environ.get('PROCTORING_MAX_QUEUED', 8))
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.preload_objects = preload_objects
+        self.object_backend = object_backend
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        # spawned, not forked, the API process may already run TensorFlow threads
+        self._context = multiprocessing.get_context('spawn')
+        self._progress = self._context.Queue()
+        self._pool = self._new_pool()
+        self._reader = threading.Thread(target=self._read_progress, name='job-progress',
+                                        daemon=True)
+        self._reader.start()
+
+    def submit(self, video_path, **options):
+        """
+        Queue a video for analysis
+
+        Parameters
+        ----------
+        video_path : string
+            Path or URL of the video
+        **options
+            Passed to ``video_job.analyze_video``
+
+        Raises
+        ------
+        QueueFull
+            If max_queued jobs are already waiting
+
+        Returns
+        -------
+        job_id : string
+
+        """
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job['status'] == QUEUED)
+            if queued >= self.max_queued:
+                raise QueueFull("{} jobs are waiting".format(queued))
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'id': job_id,
+                'status': QUEUED,
+                'video': video_path,
+                'submitted': time.time(),
+                'started': None,
+                'finished': None,
+                'progress': {'frames': 0, 'total': None},
+                'result': None,
+                'error': None
+            }
+        try:
+            try:
+                future = self._pool.submit(_run_job, job_id, video_path, options)
+            except BrokenProcessPool:
+                # a worker died, e.g. out of memory, and took the pool with it
+                self._pool = self._new_pool()
+                future = self._pool.submit(_run_job, job_id, video_path, options)
+        except Exception:
+            with self._lock:
+                del self._jobs[job_id]
+            raise
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return job_id
+
+    def get(self, job_id):
+        """Copy of a job, or None if it is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else dict(job, progress=dict(job['progress']))
+
+    def stats(self):
+        """Number of jobs by status"""
+        with self._lock:
+            counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+            return counts
+
+    def close(self):
+        """Stop the workers, cancelling the jobs that have not started"""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._progress.put(None)
+        self._reader.join()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(self.workers, mp_context=self._context,
+                                   initializer=_init_worker,
+                                   initargs=(self._progress, self.preload_objects,
+                                             self.object_backend))
+
+    def _read_progress(self):
+        while True:
+            item = self._progress.get()
+            if item is None:
+                return
+            job_id, decoded, total = item
+            with self._lock:
+                job = self._jobs.get(job_id)
+                # progress can arrive after the result, it is then stale
+                if job is None or job['status'] not in (QUEUED, RUNNING):
+                    continue
+                if job['status'] == QUEUED:
+                    job['status'] = RUNNING
+                    job['started'] = time.time()
+                job['progress'] = {'frames': decoded, 'total': total}
+
+    def _finish(self, job_id, future):
+        with self._lock:
+            job = self._jobs[job_id]
+            job['finished'] = time.time()
+            if future.cancelled():
+                job['status'] = FAILED
+                job['error'] = 'cancelled'
+            elif future.exception() is not None:
+                job['status'] = FAILED
+                job['error'] = str(future.exception())
+            else:
+                job['status'] = DONE
+                job['result'] = future.result()
+                job['progress']['frames'] = job['result']['decoded_frames']
+            finished = [k for k, j in self._jobs.items() if j['status'] in (DONE, FAILED)]
+            for k in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[k]
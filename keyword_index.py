@@ -0,0 +1,144 @@
+"""
+Question paper keyword index for live transcript matching
+
+The question paper is tokenized, stripped of stop words and stemmed once
+and the result is cached as JSON next to the paper, keyed by the paper's
+SHA-256, so it is only rebuilt when the paper changes. Transcript chunks are
+then matched against the index as they are recognized, giving timestamped
+``KeywordHit`` events, with work proportional to the chunk.
+"""
+
+import re
+import json
+import hashlib
+from collections import namedtuple
+from functools import lru_cache
+
+from nltk.stem import PorterStemmer
+
+# stem of the question paper keyword, the word as spoken, and start and end
+# in seconds of the speech segment it was spoken in
+KeywordHit = namedtuple('KeywordHit', ['keyword', 'word', 'start', 'end'])
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+_stemmer = PorterStemmer()
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    """Porter stem of a lower case word, cached"""
+    return _stemmer.stem(word)
+
+
+def tokenize(text):
+    """Lower case word tokens of a text, without possessive 's"""
+    return [t[:-2] if t.endswith("'s") else t for t in TOKEN_PATTERN.findall(text.lower())]
+
+
+def english_stop_words():
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
+
+
+class QuestionPaperIndex:
+    """
+    Stemmed keywords of a question paper
+
+    Parameters
+    ----------
+    keywords : dict
+        Stem to the sorted words of the paper with that stem
+    stop_words : set of string
+        Words that are never keywords
+    source_hash : string, optional
+        SHA-256 of the paper the index was built from. The default is None.
+
+    """
+    def __init__(self, keywords, stop_words, source_hash=None):
+        self.keywords = keywords
+        self.stop_words = frozenset(stop_words)
+        self.source_hash = source_hash
+
+    @classmethod
+    def from_text(cls, text, stop_words=None, source_hash=None):
+        """Build the index of a question paper's text"""
+        if stop_words is None:
+            stop_words = english_stop_words()
+        keywords = {}
+        for word in tokenize(text):
+            if word not in stop_words:
+                keywords.setdefault(stem(word), set()).add(word)
+        keywords = {k: sorted(v) for k, v in keywords.items()}
+        return cls(keywords, stop_words, source_hash)
+
+    @classmethod
+    def load_or_build(cls, paper_path, cache_path=None, stop_words=None):
+        """
+        Load the cached index of a question paper, building it if needed
+
+        Parameters
+        ----------
+        paper_path : string
+            Path to the question paper text file
+        cache_path : string, optional
+            Path of the cached index. The default is paper_path + '.index.json'.
+        stop_words : set of string, optional
+            The default is NLTK's English stop words. The cached index is
+            only used if it was built with the same stop words.
+
+        Returns
+        -------
+        index : QuestionPaperIndex
+
+        """
+        if cache_path is None:
+            cache_path = paper_path + '.index.json'
+        if stop_words is None:
+            stop_words = english_stop_words()
+        with open(paper_path, 'rb') as f:
+            data = f.read()
+        source_hash = hashlib.sha256(data).hexdigest()
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+            if cached['sha256'] == source_hash and set(cached['stop_words']) == set(stop_words):
+                return cls(cached['keywords'], cached['stop_words'], source_hash)
+        except (OSError, ValueError, KeyError):
+            pass
+
+        index = cls.from_text(data.decode('utf-8', errors='ignore'), stop_words, source_hash)
+        index.save(cache_path)
+        return index
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'sha256': self.source_hash, 'keywords': self.keywords,
+                       'stop_words': sorted(self.stop_words)}, f)
+
+    def content_words(self, text):
+        """Tokens of a text that are not stop words"""
+        return [w for w in tokenize(text) if w not in self.stop_words]
+
+    def match(self, text, start=0.0, end=0.0):
+        """
+        Keywords of the paper spoken in a transcript chunk
+
+        Parameters
+        ----------
+        text : string
+            Recognized text of a speech segment
+        start, end : float, optional
+            Time of the segment, copied to the hits. The default is 0.
+
+        Returns
+        -------
+        hits : list of KeywordHit
+
+        """
+        hits = []
+        for word in self.content_words(text):
+            keyword = stem(word)
+            if keyword in self.keywords:
+                hits.append(KeywordHit(keyword, word, start, end))
+        return hits
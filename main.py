@@ -1,15 +1,38 @@
-from fastapi import FastAPI, APIRouter
+import json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from typing import Optional
 
-from eye_tracker import track_eye
-from head_pose_estimation import detect_head_pose
-from mouth_opening_detector import mouth_opening_detector
-from person_and_phone import detect_phone_and_person
+from job_queue import JobQueue, QueueFull
+from object_detector import get_object_detector
+
+# The modules that load models are imported by the endpoints that use them.
+# The spawned job workers import this file again as __mp_main__, and must
+# only load their own object detector.
+
+
+jobs = None
+# object detector shared by the request threads, like the one of every job worker;
+# every backend is thread safe, the TFLite ones run on a pool of interpreters
+detector = None
+DETECTOR_POOL_SIZE = 2
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # worker processes for /jobs, sized by PROCTORING_WORKERS and PROCTORING_MAX_QUEUED
+    global jobs, detector
+    jobs = JobQueue()
+    detector = get_object_detector(size=320, pool_size=DETECTOR_POOL_SIZE)
+    yield
+    jobs.close()
 
 
 app = FastAPI(title="Proctoring AI", 
               description="AI-based automated proctoring system",
-              version="1.0.0")
+              version="1.0.0",
+              lifespan=lifespan)
 
 
 @app.get("/")
@@ -17,7 +40,10 @@ def read_root():
     return {
         "message": "Proctoring AI System",
         "endpoints": {
-            "/analyze_video": "POST - Analyze video with all modules",
+            "/analyze_video": "POST - Analyze video with all modules in one pass",
+            "/analyze_video/stream": "GET - Stream the per-frame results as NDJSON or SSE",
+            "/jobs": "POST - Queue a video analysis job, returns its id",
+            "/jobs/{job_id}": "GET - Status, progress and result of a job",
             "/eye_tracking": "POST - Track eye movements",
             "/head_pose": "POST - Detect head pose",
             "/mouth_detection": "POST - Detect mouth opening",
@@ -27,25 +53,102 @@ def read_root():
 
 
 @app.post("/analyze_video")
-def analyze_video(video_url: Optional[str] = None):
+def analyze_video(video_url: Optional[str] = None, analyzers: Optional[str] = None,
+                  every: int = Query(1, ge=1), include_frames: bool = True):
     """
-    Analyze video with all proctoring modules.
-    If video_url is None, uses webcam (device 0).
+    Analyze video with all proctoring modules in a single decoding pass.
+    If video_url is None, uses webcam (device 0) for 300 frames.
+    analyzers is a comma separated subset of eyes, head, mouth and objects.
+    Returns the per-frame results and the detected events.
     """
     try:
-        track_eye(video_url)
-        detect_head_pose(video_url)
-        mouth_opening_detector(video_url)
-        detect_phone_and_person(video_url)
-        return {"message": "Success", "status": "completed"}
+        from video_job import analyze_video as run_video_job
+        names = [n.strip() for n in analyzers.split(",")] if analyzers else None
+        result = run_video_job(video_url, names, every=every, include_frames=include_frames,
+                               object_detector=detector)
+        return {"message": "Success", "status": "completed", "result": result}
     except Exception as e:
         return {"message": "Error", "error": str(e)}
 
 
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def format_record(kind, record, format):
+    """One NDJSON line, or one Server-Sent Event named after the record kind."""
+    if format == "sse":
+        return "event: {}\ndata: {}\n\n".format(kind, json.dumps(record))
+    return json.dumps(dict(record, type=kind)) + "\n"
+
+
+def stream_records(records, format):
+    try:
+        for kind, record in records:
+            yield format_record(kind, record, format)
+    except Exception as e:
+        # the status line is already sent, the error ends the stream instead
+        yield format_record("error", {"error": str(e)}, format)
+
+
+@app.get("/analyze_video/stream")
+def analyze_video_stream(video_url: Optional[str] = None, analyzers: Optional[str] = None,
+                         every: int = Query(1, ge=1), include_frames: bool = True,
+                         format: str = "ndjson"):
+    """
+    Analyze a video in one pass and stream the results while it runs.
+    format=ndjson sends one JSON object per line with a "type" of video,
+    frame, event, end or error; format=sse sends the same records as
+    Server-Sent Events for EventSource. Events are sent as soon as they end.
+    include_frames=false sends only the events and the totals. The next
+    frame is decoded only once the previous record is sent, so a slow client
+    slows the analysis down instead of results piling up in memory.
+    """
+    if format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or sse")
+    names = [n.strip() for n in analyzers.split(",")] if analyzers else None
+    # the parameters are checked, the video opened and the analyzers built here,
+    # before the status line is sent
+    try:
+        from video_job import iter_video
+        records = iter_video(video_url, names, every=every, object_detector=detector)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not include_frames:
+        records = (item for item in records if item[0] != "frame")
+    return StreamingResponse(stream_records(records, format), media_type=STREAM_FORMATS[format],
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/jobs", status_code=202)
+def create_job(video_url: str, analyzers: Optional[str] = None, every: int = Query(1, ge=1),
+               include_frames: bool = True):
+    """
+    Queue a video for analysis by the worker pool and return its job id.
+    Responds with 429 when too many jobs are already waiting.
+    """
+    names = [n.strip() for n in analyzers.split(",")] if analyzers else None
+    try:
+        job_id = jobs.submit(video_url, analyzers=names, every=every,
+                             include_frames=include_frames)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail="Too many queued jobs: {}".format(e))
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status, progress and, once done, result of a job."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
 @app.post("/eye_tracking")
 def eye_tracking(video_url: Optional[str] = None):
     """Track eye movements in video."""
     try:
+        from eye_tracker import track_eye
         track_eye(video_url)
         return {"message": "Eye tracking completed"}
     except Exception as e:
@@ -56,6 +159,7 @@ def eye_tracking(video_url: Optional[str] = None):
 def head_pose(video_url: Optional[str] = None):
     """Detect head pose in video."""
     try:
+        from head_pose_estimation import detect_head_pose
         detect_head_pose(video_url)
         return {"message": "Head pose detection completed"}
     except Exception as e:
@@ -66,6 +170,7 @@ def head_pose(video_url: Optional[str] = None):
 def mouth_detection(video_url: Optional[str] = None):
     """Detect mouth opening in video."""
     try:
+        from mouth_opening_detector import mouth_opening_detector
         mouth_opening_detector(video_url)
         return {"message": "Mouth detection completed"}
     except Exception as e:
@@ -76,6 +181,7 @@ def mouth_detection(video_url: Optional[str] = None):
 def person_phone(video_url: Optional[str] = None):
     """Detect persons and phones in video."""
     try:
+        from person_and_phone import detect_phone_and_person
         detect_phone_and_person(video_url)
         return {"message": "Person and phone detection completed"}
     except Exception as e:
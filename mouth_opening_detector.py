@@ -5,6 +5,7 @@ Created on Fri Jul 31 01:04:44 2020
 @author: hp
 """
 
+import time
 import cv2
 from face_detector import get_face_detector, find_faces
 from face_landmarks import get_landmark_model, detect_marks, draw_marks
@@ -17,7 +18,42 @@ d_inner = [0]*3
 font = cv2.FONT_HERSHEY_SIMPLEX 
 
 
-def mouth_opening_detector(video_path):
+def lip_distances(shape):
+    '''
+    Vertical distances between the outer and the inner lip points
+
+    :param shape: facial landmarks of the face
+    :return: list of outer and list of inner distances
+    '''
+    # landmarks are unsigned, a closed mouth must not wrap around
+    outer = [int(shape[p2][1]) - int(shape[p1][1]) for p1, p2 in outer_points]
+    inner = [int(shape[p2][1]) - int(shape[p1][1]) for p1, p2 in inner_points]
+    return outer, inner
+
+def mouth_open(shape, closed_outer=None, closed_inner=None):
+    '''
+    Compare the lip distances of a face with the recorded closed mouth ones
+
+    :param shape: facial landmarks of the face
+    :param closed_outer: closed mouth outer lip distances, default the recorded ones
+    :param closed_inner: closed mouth inner lip distances, default the recorded ones
+    :return: whether the mouth is open
+    '''
+    closed_outer = d_outer if closed_outer is None else closed_outer
+    closed_inner = d_inner if closed_inner is None else closed_inner
+    outer, inner = lip_distances(shape)
+    cnt_outer = sum(1 for d, closed in zip(outer, closed_outer) if closed + 3 < d)
+    cnt_inner = sum(1 for d, closed in zip(inner, closed_inner) if closed + 2 < d)
+    return cnt_outer > 3 and cnt_inner > 2
+
+def mouth_opening_detector(video_path, on_mouth=None):
+    '''
+    Detect an open mouth in a video or the webcam
+
+    :param video_path: path of the video, the webcam if None or empty
+    :param on_mouth: optional callable, called with the time.monotonic() time
+        of every frame with a face and whether its mouth is open
+    '''
     # Use webcam if no video path provided
     if video_path is None or video_path == "":
         video_path = 0
@@ -46,19 +82,18 @@ def mouth_opening_detector(video_path):
 
     while(True):
         ret, img = cap.read()
+        if not ret:
+            break
+        # the time the frame was read, on the same clock as audio_capture
+        frame_time = time.monotonic()
         rects = find_faces(img, face_model)
         for rect in rects:
             shape = detect_marks(img, landmark_model, rect)
-            cnt_outer = 0
-            cnt_inner = 0
             draw_marks(img, shape[48:])
-            for i, (p1, p2) in enumerate(outer_points):
-                if d_outer[i] + 3 < shape[p2][1] - shape[p1][1]:
-                    cnt_outer += 1 
-            for i, (p1, p2) in enumerate(inner_points):
-                if d_inner[i] + 2 <  shape[p2][1] - shape[p1][1]:
-                    cnt_inner += 1
-            if cnt_outer > 3 and cnt_inner > 2:
+            is_open = mouth_open(shape)
+            if on_mouth is not None:
+                on_mouth(frame_time, is_open)
+            if is_open:
                 print('Mouth open')
                 cv2.putText(img, 'Mouth open', (30, 30), font,
                         1, (0, 255, 255), 2)
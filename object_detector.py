@@ -0,0 +1,367 @@
+"""
+Object detectors for person, phone and laptop detection
+
+Both backends return the same ``Detection`` tuples so the dashboards can
+switch between them:
+    'yolov3'        - YOLOv3 (Darknet-53) in Tensorflow, see person_and_phone.py
+    'ssd_mobilenet' - SSD-MobileNet v1 COCO TFLite model
+    'yolov3_zoom'   - YOLOv3 with a second pass on high resolution tiles for
+                      small phones, see ZoomDetector
+The backend can be chosen with the PROCTORING_DETECTOR environment variable
+and the YOLOv3 precision with PROCTORING_YOLO_VARIANT, see yolo_quantize.py.
+"""
+
+import os
+import sys
+import threading
+from collections import namedtuple
+import cv2
+import numpy as np
+
+from yolo_common import Letterbox
+
+# Get the directory where this script is located
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SSD_DIR = os.path.join(SCRIPT_DIR, 'coco models', 'tflite mobnetv1 ssd')
+SSD_MODEL_PATH = os.path.join(SSD_DIR, 'coco_ssd_mobilenet', 'detect.tflite')
+
+PERSON = 'person'
+PHONE = 'phone'
+LAPTOP = 'laptop'
+
+# class ids of the labels used for proctoring in each model's label map
+YOLO_LABELS = {0: PERSON, 63: LAPTOP, 67: PHONE}
+SSD_LABELS = {0: PERSON, 72: LAPTOP, 76: PHONE}
+
+# label, score and box as normalized (x1, y1, x2, y2) of the original frame
+Detection = namedtuple('Detection', ['label', 'score', 'box'])
+
+class ObjectDetector:
+    """
+    Base class of the object detection backends
+
+    Subclasses implement ``detect`` which takes a BGR frame and returns a
+    list of ``Detection`` for the proctoring labels only.
+    """
+    name = None
+
+    def detect(self, img):
+        raise NotImplementedError
+
+class YoloV3Detector(ObjectDetector):
+    """
+    YOLOv3 backend
+
+    Parameters
+    ----------
+    size : int, optional
+        Side of the square network input. The default is 416.
+    score_thresh : float, optional
+        Minimum score of a detection. The default is 0.6.
+    model : callable, optional
+        YOLOv3 model taking letterboxed uint8 BGR batches, or an
+        ``inference_batcher.MicroBatcher`` in front of it. The default
+        compiles the one loaded by person_and_phone for the given size with
+        ``yolo_inference.CompiledYolo``, scoring only the proctoring classes.
+    variant : string, optional
+        'float32' for the Tensorflow model, or a quantized TFLite variant
+        converted by yolo_quantize.py: 'dynamic', 'float16' or 'int8'.
+        Ignored if a model is given. The default is 'float32'.
+    num_threads : int, optional
+        Number of TFLite interpreter threads of quantized variants. The
+        default is 4.
+    pool_size : int, optional
+        Number of TFLite interpreters of quantized variants, the calls of
+        threads sharing the detector run on as many in parallel. The
+        default is 1.
+
+    """
+    name = 'yolov3'
+
+    def __init__(self, size=416, score_thresh=0.6, model=None, variant='float32',
+                 num_threads=4, pool_size=1):
+        class_thresholds = {class_id: score_thresh for class_id in YOLO_LABELS}
+        if model is None and variant == 'float32':
+            from yolo_inference import CompiledYolo
+            model = CompiledYolo(sizes=(size,), uint8_input=True,
+                                 class_thresholds=class_thresholds)
+        elif model is None:
+            from yolo_quantize import TFLiteYolo, tflite_path
+            model = TFLiteYolo(tflite_path(variant, size), class_thresholds,
+                               num_threads=num_threads, pool_size=pool_size)
+        self.model = model
+        self.size = size
+        self.score_thresh = score_thresh
+        self._local = threading.local()
+
+    @property
+    def letterbox(self):
+        """Letterbox of the calling thread, callers sharing a detector never share its buffer"""
+        letterbox = getattr(self._local, 'letterbox', None)
+        if letterbox is None:
+            letterbox = self._local.letterbox = Letterbox(self.size)
+        return letterbox
+
+    def detect(self, img):
+        # the buffer and geometry stay untouched until this thread's next call
+        letterbox = self.letterbox
+        boxes, scores, classes, nums = self.model(letterbox(img))
+        scores, classes = np.asarray(scores[0]), np.asarray(classes[0])
+        boxes = letterbox.unmap_boxes(boxes[0])
+
+        detections = []
+        for i in range(int(nums[0])):
+            label = YOLO_LABELS.get(int(classes[i]))
+            if label is None or scores[i] < self.score_thresh:
+                continue
+            detections.append(Detection(label, float(scores[i]), tuple(boxes[i])))
+        return detections
+
+class SSDMobileNetDetector(ObjectDetector):
+    """
+    SSD-MobileNet v1 TFLite backend
+
+    Runs on the interpreter pool of ``seg_tflite.TFLiteDetector``, so one
+    detector can serve several camera streams in parallel.
+
+    Parameters
+    ----------
+    model_path : string, optional
+        Path to the tflite model. The default is the COCO SSD model shipped
+        in 'coco models/tflite mobnetv1 ssd'.
+    num_threads : int, optional
+        Number of threads used by each TFLite interpreter. The default is 4.
+    score_thresh : float, optional
+        Minimum score of a detection. The default is 0.6.
+    pool_size : int, optional
+        Number of interpreters. The default is 1.
+
+    """
+    name = 'ssd_mobilenet'
+
+    def __init__(self, model_path=SSD_MODEL_PATH, num_threads=4, score_thresh=0.6,
+                 pool_size=1):
+        if SSD_DIR not in sys.path:
+            sys.path.append(SSD_DIR)
+        from seg_tflite import TFLiteDetector
+        self.detector = TFLiteDetector(model_path, pool_size=pool_size, num_threads=num_threads,
+                                       nms=False)
+        self.score_thresh = score_thresh
+
+    def detect(self, img):
+        return self.detect_many([img])[0]
+
+    def detect_many(self, frames):
+        """``detect`` on several frames in parallel"""
+        results = []
+        for output_dict in self.detector.detect(frames):
+            boxes = output_dict['detection_boxes']
+            classes = output_dict['detection_classes']
+            scores = output_dict['detection_scores']
+            num = int(output_dict['num_detections'])
+
+            detections = []
+            for i in range(num):
+                label = SSD_LABELS.get(int(classes[i]))
+                if label is None or scores[i] < self.score_thresh:
+                    continue
+                # SSD boxes are (ymin, xmin, ymax, xmax)
+                y1, x1, y2, x2 = boxes[i]
+                detections.append(Detection(label, float(scores[i]), (x1, y1, x2, y2)))
+            results.append(detections)
+        return results
+
+class ZoomDetector(ObjectDetector):
+    """
+    Coarse-to-fine YOLOv3 backend for small phones on high resolution frames
+
+    A phone held low in a 1080p frame is only a few pixels tall once the
+    frame is scaled down to the network input. After the low resolution pass
+    over the whole frame, square tiles are cropped at full resolution around
+    low confidence phone candidates and the hand region of every person,
+    resized to the network input and run in one batched call. Phones found
+    in the tiles are merged into the coarse detections.
+
+    Parameters
+    ----------
+    size : int, optional
+        Network input of the pass over the whole frame. The default is 416.
+    tile_size : int, optional
+        Network input of the tiles. The default is 320.
+    score_thresh : float, optional
+        Minimum score of a detection. The default is 0.6.
+    candidate_thresh : float, optional
+        Minimum score of a coarse phone detection that gets a tile. The
+        default is 0.2.
+    max_tiles : int, optional
+        Maximum number of tiles per frame. The default is 4.
+    model : callable, optional
+        YOLOv3 model taking letterboxed uint8 BGR batches of both sizes, with
+        per-class thresholds of at most ``candidate_thresh``. The default
+        compiles the one loaded by person_and_phone with
+        ``yolo_inference.CompiledYolo``.
+
+    """
+    name = 'yolov3_zoom'
+
+    def __init__(self, size=416, tile_size=320, score_thresh=0.6, candidate_thresh=0.2,
+                 max_tiles=4, model=None):
+        if model is None:
+            from yolo_inference import CompiledYolo
+            model = CompiledYolo(sizes=tuple(sorted({size, tile_size})), uint8_input=True,
+                                 class_thresholds={
+                                     class_id: candidate_thresh for class_id in YOLO_LABELS})
+        self.coarse = YoloV3Detector(size=size, score_thresh=candidate_thresh, model=model)
+        self.model = model
+        self.tile_size = tile_size
+        self.score_thresh = score_thresh
+        self.max_tiles = max_tiles
+
+    def tile_regions(self, detections, width, height):
+        """
+        Square regions of the frame to zoom into
+
+        Parameters
+        ----------
+        detections : list of Detection
+            Coarse detections down to ``candidate_thresh``
+        width, height : int
+            Size of the frame
+
+        Returns
+        -------
+        regions : list of tuple
+            (x, y, side) in pixels, at most ``max_tiles`` of them, phone
+            candidates first
+
+        """
+        areas = []
+        candidates = sorted((d for d in detections
+                             if d.label == PHONE and d.score < self.score_thresh),
+                            key=lambda d: -d.score)
+        for d in candidates:
+            x1, y1, x2, y2 = d.box
+            # the candidate with some context around it
+            side = 3 * max((x2 - x1) * width, (y2 - y1) * height)
+            areas.append(((x1 + x2) / 2 * width, (y1 + y2) / 2 * height, side))
+        for d in detections:
+            if d.label != PERSON or d.score < self.score_thresh:
+                continue
+            x1, y1, x2, y2 = d.box
+            # hands holding a phone are usually in the lower part of the box
+            w, h = (x2 - x1) * width, (y2 - y1) * height
+            areas.append(((x1 + x2) / 2 * width, y1 * height + 0.7 * h, max(w, 0.5 * h)))
+
+        regions = []
+        for cx, cy, side in areas[:self.max_tiles]:
+            # never upscale the crop, and keep it inside the frame
+            side = int(min(max(side, self.tile_size), width, height))
+            x = int(np.clip(cx - side / 2, 0, width - side))
+            y = int(np.clip(cy - side / 2, 0, height - side))
+            regions.append((x, y, side))
+        return regions
+
+    def detect(self, img):
+        detections = self.coarse.detect(img)
+        height, width = img.shape[:2]
+        regions = self.tile_regions(detections, width, height)
+        detections = [d for d in detections if d.score >= self.score_thresh]
+        if not regions:
+            return detections
+
+        # a batch per call, the detector may be shared between streams
+        tiles = np.empty((len(regions), self.tile_size, self.tile_size, 3), dtype=np.uint8)
+        for tile, (x, y, side) in zip(tiles, regions):
+            cv2.resize(img[y:y + side, x:x + side], (self.tile_size, self.tile_size),
+                       dst=tile, interpolation=cv2.INTER_AREA)
+        boxes, scores, classes, nums = self.model(tiles)
+        boxes, scores, classes = np.asarray(boxes), np.asarray(scores), np.asarray(classes)
+
+        for i, (x, y, side) in enumerate(regions):
+            for j in range(int(nums[i])):
+                if YOLO_LABELS.get(int(classes[i, j])) != PHONE or scores[i, j] < self.score_thresh:
+                    continue
+                box = boxes[i, j] * side + (x, y, x, y)
+                box = np.clip(box / (width, height, width, height), 0.0, 1.0)
+                detections.append(Detection(PHONE, float(scores[i, j]), tuple(box)))
+        return self.merge_phones(detections)
+
+    @staticmethod
+    def merge_phones(detections, iou_threshold=0.5):
+        """Suppress phones found both in the frame and in overlapping tiles"""
+        phones = [d for d in detections if d.label == PHONE]
+        if len(phones) < 2:
+            return detections
+        rects = [(d.box[0], d.box[1], d.box[2] - d.box[0], d.box[3] - d.box[1]) for d in phones]
+        keep = np.array(cv2.dnn.NMSBoxes(rects, [d.score for d in phones], 0.0,
+                                         iou_threshold)).reshape(-1)
+        return [d for d in detections if d.label != PHONE] + [phones[i] for i in keep]
+
+BACKENDS = (YoloV3Detector.name, SSDMobileNetDetector.name, ZoomDetector.name)
+
+def get_object_detector(backend=None, size=416, score_thresh=0.6, num_threads=4,
+                        variant=None, pool_size=1):
+    """
+    Get an object detector
+
+    Parameters
+    ----------
+    backend : string, optional
+        'yolov3', 'ssd_mobilenet' or 'yolov3_zoom'. The default is the value
+        of the PROCTORING_DETECTOR environment variable or 'yolov3'.
+    size : int, optional
+        YOLOv3 input size. The default is 416.
+    score_thresh : float, optional
+        Minimum score of a detection. The default is 0.6.
+    num_threads : int, optional
+        TFLite interpreter threads. The default is 4.
+    variant : string, optional
+        YOLOv3 precision, 'float32', 'dynamic', 'float16' or 'int8'. The
+        default is the value of the PROCTORING_YOLO_VARIANT environment
+        variable or 'float32'.
+    pool_size : int, optional
+        Number of SSD-MobileNet or quantized YOLOv3 interpreters. The
+        default is 1.
+
+    Returns
+    -------
+    detector : ObjectDetector
+
+    """
+    if backend is None:
+        backend = os.environ.get('PROCTORING_DETECTOR', YoloV3Detector.name)
+    if backend == YoloV3Detector.name:
+        if variant is None:
+            variant = os.environ.get('PROCTORING_YOLO_VARIANT', 'float32')
+        return YoloV3Detector(size=size, score_thresh=score_thresh, variant=variant,
+                              num_threads=num_threads, pool_size=pool_size)
+    if backend == SSDMobileNetDetector.name:
+        return SSDMobileNetDetector(num_threads=num_threads, score_thresh=score_thresh,
+                                    pool_size=pool_size)
+    if backend == ZoomDetector.name:
+        return ZoomDetector(size=size, score_thresh=score_thresh)
+    raise ValueError("Unknown object detector backend: {}".format(backend))
+
+def count_objects(detections, device_labels=(PHONE,)):
+    """
+    Summarize detections for proctoring
+
+    Parameters
+    ----------
+    detections : list of Detection
+        Output of ``ObjectDetector.detect``
+    device_labels : tuple, optional
+        Labels reported as a forbidden device. The default is (PHONE,).
+
+    Returns
+    -------
+    person_count : int
+        Number of persons detected
+    device_detected : bool
+        Whether any forbidden device was detected
+
+    """
+    person_count = sum(1 for d in detections if d.label == PERSON)
+    device_detected = any(d.label in device_labels for d in detections)
+    return person_count, device_detected
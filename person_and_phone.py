@@ -9,6 +9,11 @@ import tensorflow as tf
 import numpy as np
 import cv2
 import os
+import json
+import hashlib
+
+from box_renderer import BoxRenderer
+from yolo_common import yolo_anchors, yolo_anchor_masks
 
 # Get the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -26,7 +31,6 @@ from tensorflow.keras.layers import (
     BatchNormalization
 )
 from tensorflow.keras.regularizers import l2
-import wget
 
 def load_darknet_weights(model, weights_file):
     '''
@@ -102,22 +106,14 @@ def draw_outputs(img, outputs, class_names):
     :param class_names: list of all class names found in the dataset
     '''
     boxes, objectness, classes, nums = outputs
-    boxes, objectness, classes, nums = boxes[0], objectness[0], classes[0], nums[0]
-    wh = np.flip(img.shape[0:2])
-    for i in range(nums):
-        x1y1 = tuple((np.array(boxes[i][0:2]) * wh).astype(np.int32))
-        x2y2 = tuple((np.array(boxes[i][2:4]) * wh).astype(np.int32))
-        img = cv2.rectangle(img, x1y1, x2y2, (255, 0, 0), 2)
-        img = cv2.putText(img, '{} {:.4f}'.format(
-            class_names[int(classes[i])], objectness[i]),
-            x1y1, cv2.FONT_HERSHEY_COMPLEX_SMALL, 1, (0, 0, 255), 2)
-    return img
-
-yolo_anchors = np.array([(10, 13), (16, 30), (33, 23), (30, 61), (62, 45),
-                         (59, 119), (116, 90), (156, 198), (373, 326)],
-                        np.float32) / 416
-
-yolo_anchor_masks = np.array([[6, 7, 8], [3, 4, 5], [0, 1, 2]])
+    n = int(nums[0])
+    boxes = np.asarray(boxes[0])[:n]
+    objectness, classes = np.asarray(objectness[0])[:n], np.asarray(classes[0])[:n]
+    labels = ['{} {:.2f}'.format(class_names[int(c)], score)
+              for c, score in zip(classes, objectness)]
+    return renderer.draw(img, boxes, labels, classes)
+
+renderer = BoxRenderer()
     
 def DarknetConv(x, filters, kernel_size, strides=1, batch_norm=True):
     '''
@@ -324,17 +320,109 @@ def YoloV3(size=None, channels=3, anchors=yolo_anchors,
 def weights_download(out=None):
     if out is None:
         out = os.path.join(SCRIPT_DIR, 'models/yolov3.weights')
+    import wget
     _ = wget.download('https://pjreddie.com/media/files/yolov3.weights', out=out)
+
+def file_sha256(path, block_size=1 << 20):
+    '''
+    Helper function that computes the SHA-256 checksum of a file.
     
-# Download weights if not present
-weights_path = os.path.join(SCRIPT_DIR, 'models/yolov3.weights')
-if not os.path.exists(weights_path):
-    print("Downloading YOLOv3 weights... This may take a few minutes.")
-    weights_download(weights_path)
-    print("YOLOv3 weights downloaded successfully!")
+    :param path: Path to the file
+    :param block_size: Number of bytes read at once
+    '''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
-yolo = YoloV3()
-load_darknet_weights(yolo, weights_path) 
+def save_weights_cache(model, cache_file):
+    '''
+    Saves all weights of the model in Tensorflow layout as a single flat .npy
+    bundle, along with a json manifest holding the shapes and the checksum.
+    Both are written under temporary names and renamed into place, so a
+    process starting at the same time never reads a half written cache.
+    
+    :param model: Object of the Yolo v3 model with weights loaded
+    :param cache_file: Path to the .npy bundle
+    '''
+    weights = model.get_weights()
+    flat = np.concatenate([w.ravel() for w in weights]).astype(np.float32)
+    # unique per process, concurrent first starts each write their own
+    tmp_suffix = '.{}.tmp'.format(os.getpid())
+    with open(cache_file + tmp_suffix, 'wb') as f:
+        np.save(f, flat)
+    manifest = {
+        'shapes': [list(w.shape) for w in weights],
+        'sha256': file_sha256(cache_file + tmp_suffix)
+    }
+    manifest_file = os.path.splitext(cache_file)[0] + '.json'
+    with open(manifest_file + tmp_suffix, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(cache_file + tmp_suffix, cache_file)
+    os.replace(manifest_file + tmp_suffix, manifest_file)
+
+def load_weights_cache(model, cache_file, verify=True):
+    '''
+    Loads weights saved by save_weights_cache. The bundle is memory-mapped
+    and set_weights copies it into the model's variables, which skips the
+    parsing and transposing of the darknet weights. Every process still
+    holds its own copy of the weights.
+    
+    :param model: Object of the Yolo v3 model
+    :param cache_file: Path to the .npy bundle
+    :param verify: Whether to check the bundle against the manifest checksum
+    :raises OSError, ValueError: If the cache is missing, damaged or does
+        not match the manifest
+    '''
+    with open(os.path.splitext(cache_file)[0] + '.json') as f:
+        manifest = json.load(f)
+    if verify and file_sha256(cache_file) != manifest['sha256']:
+        raise ValueError('checksum mismatch in {}'.format(cache_file))
+    
+    flat = np.load(cache_file, mmap_mode='r')
+    weights = []
+    offset = 0
+    for shape in manifest['shapes']:
+        size = int(np.prod(shape))
+        weights.append(flat[offset:offset + size].reshape(shape))
+        offset += size
+    if offset != flat.size:
+        raise ValueError('weights cache {} does not match the manifest'.format(cache_file))
+    model.set_weights(weights)
+
+def load_yolo(weights_path=None, cache_file=None):
+    '''
+    Builds the Yolo v3 model and loads its weights from the cache, creating the
+    cache from the darknet weights (downloading them if needed) the first time
+    or when the cache is missing or damaged.
+    
+    :param weights_path: Path to the darknet weights
+    :param cache_file: Path to the .npy weights cache
+    '''
+    if weights_path is None:
+        weights_path = os.path.join(SCRIPT_DIR, 'models/yolov3.weights')
+    if cache_file is None:
+        cache_file = os.path.join(SCRIPT_DIR, 'models/yolov3_weights.npy')
+    
+    model = YoloV3()
+    if os.path.exists(cache_file):
+        try:
+            load_weights_cache(model, cache_file)
+            return model
+        except (OSError, ValueError, KeyError) as e:
+            print("YOLOv3 weights cache is not usable ({}), rebuilding it".format(e))
+    
+    # Download weights if not present
+    if not os.path.exists(weights_path):
+        print("Downloading YOLOv3 weights... This may take a few minutes.")
+        weights_download(weights_path)
+        print("YOLOv3 weights downloaded successfully!")
+    load_darknet_weights(model, weights_path)
+    save_weights_cache(model, cache_file)
+    return model
+
+yolo = load_yolo()
 
 
 def detect_phone_and_person(video_path):
@@ -353,6 +441,9 @@ def detect_phone_and_person(video_path):
     import time
     time.sleep(0.5)  # Give camera time to initialize
     
+    from yolo_inference import CompiledYolo
+    compiled_yolo = CompiledYolo(yolo, sizes=(320,))
+    
     print("Person and phone detection started. Press 'q' to quit.")
     print("Point camera at people or phones to detect.")
 
@@ -367,7 +458,7 @@ def detect_phone_and_person(video_path):
         img = np.expand_dims(img, 0)
         img = img / 255
         class_names = [c.strip() for c in open(os.path.join(SCRIPT_DIR, "models/classes.TXT")).readlines()]
-        boxes, scores, classes, nums = yolo(img)
+        boxes, scores, classes, nums = compiled_yolo(img)
         count=0
         for i in range(nums[0]):
             if int(classes[0][i] == 0):
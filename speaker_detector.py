@@ -0,0 +1,280 @@
+"""
+Second speaker detection on the voiced segments of the microphone
+
+Every ``SpeechSegment`` is reduced to a compact voice embedding, the mean
+and standard deviation of its MFCCs computed with the NumPy FFT. The first
+seconds of speech, or a saved profile, enroll the candidate's voice.
+Segments far from that profile are clustered online, and a cluster that
+keeps collecting speech is reported as a second speaker. A segment costs a
+few milliseconds, so this runs on every segment next to the vision pipeline.
+"""
+
+import json
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+
+# start and end in seconds of the first and last segment of the second
+# speaker's cluster, its number of segments and seconds of speech, and its
+# distance to the candidate's voice
+SpeakerEvent = namedtuple('SpeakerEvent', ['start', 'end', 'segments', 'speech_s', 'distance'])
+
+
+@lru_cache(maxsize=8)
+def mel_filterbank(sample_rate, n_fft, n_mels=26, low_hz=20.0, high_hz=None):
+    """
+    Triangular mel filters
+
+    Returns
+    -------
+    filters : np.float32
+        (n_mels, n_fft // 2 + 1) weights of the FFT bins
+
+    """
+    high_hz = high_hz or sample_rate / 2
+    mel = lambda hz: 2595 * np.log10(1 + hz / 700)
+    hz = lambda m: 700 * (10 ** (m / 2595) - 1)
+    edges = hz(np.linspace(mel(low_hz), mel(high_hz), n_mels + 2))
+    bins = np.fft.rfftfreq(n_fft, 1 / sample_rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    filters = np.maximum(0, np.minimum((bins - lower) / (center - lower),
+                                       (upper - bins) / (upper - center)))
+    return filters.astype(np.float32)
+
+
+@lru_cache(maxsize=8)
+def dct_matrix(n_in, n_out):
+    """Orthonormal DCT-II matrix keeping the first n_out coefficients"""
+    k = np.arange(n_out)[:, None]
+    n = np.arange(n_in)[None, :]
+    dct = np.cos(np.pi * k * (2 * n + 1) / (2 * n_in)) * np.sqrt(2 / n_in)
+    dct[0] /= np.sqrt(2)
+    return dct.astype(np.float32)
+
+
+def mfcc(samples, sample_rate=16000, n_mfcc=13, frame_ms=25, hop_ms=10, n_mels=26):
+    """
+    Mel frequency cepstral coefficients
+
+    Parameters
+    ----------
+    samples : np.array
+        Mono samples
+    sample_rate : int, optional
+        The default is 16000.
+    n_mfcc : int, optional
+        Coefficients per frame. The default is 13.
+    frame_ms, hop_ms : int, optional
+        Frame length and step. The defaults are 25 and 10.
+    n_mels : int, optional
+        Number of mel filters. The default is 26.
+
+    Returns
+    -------
+    coefficients : np.float32
+        (frames, n_mfcc) MFCCs, no frames if the samples are shorter than one
+
+    """
+    frame_length = int(sample_rate * frame_ms / 1000)
+    hop = int(sample_rate * hop_ms / 1000)
+    n_fft = 1 << (frame_length - 1).bit_length()
+    x = samples.astype(np.float32) / 32768
+    if len(x) < frame_length:
+        return np.zeros((0, n_mfcc), dtype=np.float32)
+    x = np.append(x[0], x[1:] - 0.97 * x[:-1])
+    frames = np.lib.stride_tricks.sliding_window_view(x, frame_length)[::hop]
+    power = np.abs(np.fft.rfft(frames * np.hamming(frame_length).astype(np.float32), n_fft)) ** 2
+    energies = power @ mel_filterbank(sample_rate, n_fft, n_mels).T
+    return np.log(energies + 1e-10) @ dct_matrix(n_mels, n_mfcc).T
+
+
+def voice_embedding(segment):
+    """
+    Mean and standard deviation of a segment's MFCCs
+
+    The 0th coefficient, the loudness, is left out so the distance to the
+    microphone does not matter.
+
+    Returns
+    -------
+    embedding : np.float32
+        2 * 12 values, or None if the segment is too short
+
+    """
+    coefficients = mfcc(segment.audio, segment.sample_rate)[:, 1:]
+    if len(coefficients) < 10:
+        return None
+    return np.concatenate([coefficients.mean(axis=0), coefficients.std(axis=0)])
+
+
+class VoiceProfile:
+    """
+    Enrolled voice of the candidate
+
+    Parameters
+    ----------
+    center : np.array
+        Mean embedding of the candidate's segments
+    scale : np.array
+        Spread of every embedding value, distances are measured in it
+    count : int, optional
+        Number of segments the profile is made of. The default is 1.
+    min_scale : float, optional
+        Lower bound of the spread. The default is 0.5.
+
+    """
+    def __init__(self, center, scale, count=1, min_scale=0.5):
+        self.center = np.asarray(center, dtype=np.float64)
+        self.count = count
+        self.min_scale = min_scale
+        self._m2 = np.asarray(scale, dtype=np.float64) ** 2 * count
+
+    @property
+    def scale(self):
+        return np.maximum(np.sqrt(self._m2 / self.count), self.min_scale)
+
+    @classmethod
+    def from_embeddings(cls, embeddings, min_scale=0.5, min_count=3):
+        """
+        Profile of embeddings of the candidate's speech
+
+        The spread is estimated from the embeddings, so at least
+        ``min_count`` of them are needed: with one the spread is zero and
+        every other segment of the candidate would look like another voice.
+        """
+        embeddings = np.asarray(embeddings)
+        if len(embeddings) < min_count:
+            raise ValueError("A voice profile needs at least {} segments, got {}".format(
+                min_count, len(embeddings)))
+        return cls(embeddings.mean(axis=0), embeddings.std(axis=0), len(embeddings), min_scale)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data['center'], data['scale'], data.get('count', 1))
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'center': self.center.tolist(),
+                       'scale': np.sqrt(self._m2 / self.count).tolist(),
+                       'count': self.count}, f)
+
+    def update(self, embedding):
+        """Add an embedding of the candidate's speech"""
+        self.count += 1
+        delta = embedding - self.center
+        self.center = self.center + delta / self.count
+        self._m2 = self._m2 + delta * (embedding - self.center)
+
+    def distance(self, a, b=None):
+        """RMS distance of an embedding to the profile, or to b, in units of the spread"""
+        b = self.center if b is None else b
+        return float(np.sqrt(np.mean(((a - b) / self.scale) ** 2)))
+
+
+class SpeakerDetector:
+    """
+    Detects a persistent second voice in the speech segments
+
+    Segments within ``candidate_distance`` of the profile are the
+    candidate's. The others are assigned to the nearest unknown speaker
+    cluster within ``cluster_distance``, or start a new one. A cluster that
+    collects ``min_segments`` segments and ``min_speech_s`` seconds of
+    speech, and whose center is not within ``candidate_distance`` of the
+    profile, raises one ``SpeakerEvent``; clusters without a segment for
+    ``forget_s`` seconds are dropped.
+
+    Parameters
+    ----------
+    on_event : callable, optional
+        Called with every ``SpeakerEvent``. The default is None.
+    profile : VoiceProfile, optional
+        Enrolled voice of the candidate. The default is None, which
+        enrolls the first ``enroll_s`` seconds of speech.
+    enroll_s : float, optional
+        Seconds of speech enrolled without a profile. The default is 10.
+    enroll_segments : int, optional
+        Segments enrolled at least, however long they are. The default is 3.
+    candidate_distance : float, optional
+        The default is 1.8, the enrolled speech is about 1 from the profile.
+    cluster_distance : float, optional
+        The default is 2.5, looser than for the candidate since one cluster
+        also takes the vowels of a voice that was not enrolled.
+    min_segments : int, optional
+        The default is 3.
+    min_speech_s : float, optional
+        The default is 3.
+    forget_s : float, optional
+        The default is 120.
+
+    """
+    def __init__(self, on_event=None, profile=None, enroll_s=10.0, enroll_segments=3,
+                 candidate_distance=1.8, cluster_distance=2.5, min_segments=3,
+                 min_speech_s=3.0, forget_s=120.0):
+        self.on_event = on_event
+        self.profile = profile
+        self.enroll_s = enroll_s
+        self.enroll_segments = enroll_segments
+        self.candidate_distance = candidate_distance
+        self.cluster_distance = cluster_distance
+        self.min_segments = min_segments
+        self.min_speech_s = min_speech_s
+        self.forget_s = forget_s
+        self.clusters = []
+        self._enrollment = []
+        self._enrolled_s = 0.0
+
+    def process(self, segment):
+        """
+        Add a speech segment
+
+        Returns
+        -------
+        speaker : string
+            'enrolling', 'candidate', 'unknown' or 'short' if the segment
+            is too short to tell
+
+        """
+        embedding = voice_embedding(segment)
+        if embedding is None:
+            return 'short'
+        if self.profile is None:
+            self._enrollment.append(embedding)
+            self._enrolled_s += segment.end - segment.start
+            if (self._enrolled_s >= self.enroll_s
+                    and len(self._enrollment) >= self.enroll_segments):
+                self.profile = VoiceProfile.from_embeddings(
+                    self._enrollment, min_count=self.enroll_segments)
+                self._enrollment = []
+            return 'enrolling'
+
+        self.clusters = [c for c in self.clusters if segment.start - c['end'] <= self.forget_s]
+        distance = self.profile.distance(embedding)
+        if distance <= self.candidate_distance:
+            # the profile keeps learning the candidate's voice
+            self.profile.update(embedding)
+            return 'candidate'
+
+        cluster = min(self.clusters, key=lambda c: self.profile.distance(embedding, c['center']),
+                      default=None)
+        if (cluster is None
+                or self.profile.distance(embedding, cluster['center']) > self.cluster_distance):
+            cluster = {'center': embedding, 'start': segment.start, 'segments': 0,
+                       'speech_s': 0.0, 'reported': False}
+            self.clusters.append(cluster)
+        cluster['segments'] += 1
+        cluster['center'] = cluster['center'] + (embedding - cluster['center']) / cluster['segments']
+        cluster['speech_s'] += segment.end - segment.start
+        cluster['end'] = segment.end
+
+        if (not cluster['reported'] and cluster['segments'] >= self.min_segments
+                and cluster['speech_s'] >= self.min_speech_s):
+            # outliers of the candidate's own voice average out close to the profile
+            distance = self.profile.distance(cluster['center'])
+            if distance > self.candidate_distance:
+                cluster['reported'] = True
+                if self.on_event is not None:
+                    self.on_event(SpeakerEvent(cluster['start'], cluster['end'],
+                                               cluster['segments'], cluster['speech_s'], distance))
+        return 'unknown'
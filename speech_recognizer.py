@@ -0,0 +1,241 @@
+"""
+Speech recognition backends for the audio proctoring
+
+All backends turn an ``audio_capture.SpeechSegment`` into text:
+    'google'       - Google Web Speech API, needs internet access
+    'vosk'         - offline Kaldi model with Vosk, read from VOSK_MODEL_PATH
+                     or models/vosk-model
+    'pocketsphinx' - offline CMU PocketSphinx
+    'stub'         - deterministic text for tests, no model at all
+The backend can be chosen with the PROCTORING_ASR environment variable.
+``RecognitionPool`` runs a backend on worker threads fed from a bounded
+queue, so a slow engine drops segments instead of falling ever further
+behind the microphone.
+"""
+
+import os
+import json
+import queue
+import threading
+
+# Get the directory where this script is located
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+VOSK_MODEL_PATH = os.environ.get('VOSK_MODEL_PATH',
+                                 os.path.join(SCRIPT_DIR, 'models', 'vosk-model'))
+
+
+class SpeechRecognizer:
+    """
+    Base class of the speech recognition backends
+
+    Subclasses implement ``recognize`` which takes a SpeechSegment and
+    returns its text, or an empty string if nothing was understood.
+    Instances are shared by the worker threads of a ``RecognitionPool``.
+    """
+    name = None
+
+    def recognize(self, segment):
+        raise NotImplementedError
+
+
+class GoogleRecognizer(SpeechRecognizer):
+    """Google Web Speech API through speech_recognition"""
+    name = 'google'
+
+    def __init__(self, language='en-US'):
+        import speech_recognition as sr
+        self.sr = sr
+        self.language = language
+
+    def recognize(self, segment):
+        audio = self.sr.AudioData(segment.audio.tobytes(), segment.sample_rate, 2)
+        try:
+            return self.sr.Recognizer().recognize_google(audio, language=self.language)
+        except self.sr.UnknownValueError:
+            return ''
+
+
+class PocketSphinxRecognizer(SpeechRecognizer):
+    """Offline CMU PocketSphinx through speech_recognition"""
+    name = 'pocketsphinx'
+
+    def __init__(self, language='en-US'):
+        import speech_recognition as sr
+        self.sr = sr
+        self.language = language
+
+    def recognize(self, segment):
+        audio = self.sr.AudioData(segment.audio.tobytes(), segment.sample_rate, 2)
+        try:
+            return self.sr.Recognizer().recognize_sphinx(audio, language=self.language)
+        except self.sr.UnknownValueError:
+            return ''
+
+
+class VoskRecognizer(SpeechRecognizer):
+    """
+    Offline Kaldi model with Vosk
+
+    Parameters
+    ----------
+    model_path : string, optional
+        Directory of an unpacked Vosk model, e.g. vosk-model-small-en-us.
+        The default is VOSK_MODEL_PATH or models/vosk-model.
+
+    """
+    name = 'vosk'
+
+    def __init__(self, model_path=VOSK_MODEL_PATH):
+        import vosk
+        if not os.path.isdir(model_path):
+            raise FileNotFoundError("Vosk model not found at {}".format(model_path))
+        self.vosk = vosk
+        # the model is shared, every call gets its own lightweight recognizer
+        self.model = vosk.Model(model_path)
+
+    def recognize(self, segment):
+        recognizer = self.vosk.KaldiRecognizer(self.model, segment.sample_rate)
+        recognizer.AcceptWaveform(segment.audio.tobytes())
+        return json.loads(recognizer.FinalResult()).get('text', '')
+
+
+class StubRecognizer(SpeechRecognizer):
+    """
+    Deterministic recognizer for tests
+
+    Parameters
+    ----------
+    text : string or callable, optional
+        Text returned for every segment, or a function of the segment
+        returning it. The default describes the segment's time span.
+
+    """
+    name = 'stub'
+
+    def __init__(self, text=None):
+        self.text = text
+
+    def recognize(self, segment):
+        if self.text is None:
+            return 'speech from {:.2f} to {:.2f}'.format(segment.start, segment.end)
+        if callable(self.text):
+            return self.text(segment)
+        return self.text
+
+
+BACKENDS = (GoogleRecognizer.name, VoskRecognizer.name, PocketSphinxRecognizer.name,
+            StubRecognizer.name)
+
+
+def get_speech_recognizer(backend=None, **kwargs):
+    """
+    Get a speech recognizer
+
+    Parameters
+    ----------
+    backend : string, optional
+        'google', 'vosk', 'pocketsphinx' or 'stub'. The default is the value
+        of the PROCTORING_ASR environment variable or 'google'.
+    **kwargs
+        Passed to the backend
+
+    Returns
+    -------
+    recognizer : SpeechRecognizer
+
+    """
+    if backend is None:
+        backend = os.environ.get('PROCTORING_ASR', GoogleRecognizer.name)
+    for cls in (GoogleRecognizer, VoskRecognizer, PocketSphinxRecognizer, StubRecognizer):
+        if backend == cls.name:
+            return cls(**kwargs)
+    raise ValueError("Unknown speech recognition backend: {}".format(backend))
+
+
+class RecognitionPool:
+    """
+    Runs a speech recognizer on worker threads
+
+    Parameters
+    ----------
+    recognizer : SpeechRecognizer
+        Backend shared by the workers
+    on_result : callable
+        Called with (segment, text) from a worker thread for every segment
+        in which something was recognized
+    workers : int, optional
+        Number of worker threads. The default is 2.
+    max_pending : int, optional
+        Segments waiting for a worker. The default is 8.
+    max_wait : float, optional
+        Seconds ``submit`` waits for room in a full queue, pushing back on
+        the capture, before the segment is dropped and counted in
+        ``dropped``. The default is 0.
+
+    """
+    def __init__(self, recognizer, on_result, workers=2, max_pending=8, max_wait=0.0):
+        self.recognizer = recognizer
+        self.on_result = on_result
+        self.max_wait = max_wait
+        self.dropped = 0
+        self.recognized = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._threads = [threading.Thread(target=self._run, name='speech-recognizer-{}'.format(i),
+                                          daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, segment):
+        """
+        Queue a segment for recognition, waiting up to ``max_wait``
+
+        Returns
+        -------
+        queued : bool
+            False if the queue was full and the segment was dropped
+
+        """
+        try:
+            if self.max_wait > 0:
+                self._queue.put(segment, timeout=self.max_wait)
+            else:
+                self._queue.put_nowait(segment)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def stats(self):
+        """Counters of the pool and its queue"""
+        with self._lock:
+            return {
+                'recognized': self.recognized,
+                'dropped': self.dropped,
+                'pending': self._queue.qsize()
+            }
+
+    def close(self):
+        """Recognize the queued segments and stop the workers"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            segment = self._queue.get()
+            if segment is None:
+                return
+            try:
+                text = self.recognizer.recognize(segment)
+            except Exception as e:
+                print("Speech recognition error: {}".format(e))
+                continue
+            with self._lock:
+                self.recognized += 1
+            if text:
+                self.on_result(segment, text)
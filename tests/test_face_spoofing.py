@@ -0,0 +1,31 @@
+import cv2
+import numpy as np
+import pytest
+
+from face_spoofing import calc_hist, HistogramFeatureExtractor
+
+
+def calc_hist_features(roi):
+    """Feature row of the original detection loop"""
+    ycrcb_hist = calc_hist(cv2.cvtColor(roi, cv2.COLOR_BGR2YCR_CB))
+    luv_hist = calc_hist(cv2.cvtColor(roi, cv2.COLOR_BGR2LUV))
+    feature_vector = np.append(ycrcb_hist.ravel(), luv_hist.ravel())
+    return feature_vector.reshape(1, len(feature_vector))
+
+
+@pytest.mark.parametrize('shape', [(220, 220), (97, 131), (31, 17), (480, 360)])
+def test_full_resolution_matches_calc_hist(shape):
+    rng = np.random.default_rng(sum(shape))
+    # smooth ROIs leave empty bins, like faces do
+    roi = cv2.GaussianBlur(rng.integers(0, 256, shape + (3,), dtype=np.uint8), (5, 5), 0)
+    extractor = HistogramFeatureExtractor(size=None)
+    np.testing.assert_array_equal(extractor(roi), calc_hist_features(roi))
+
+
+def test_downsampled_matches_calc_hist_of_resized_roi():
+    rng = np.random.default_rng(0)
+    extractor = HistogramFeatureExtractor(size=(64, 64))
+    for shape in [(220, 220), (150, 120), (64, 64)]:
+        roi = rng.integers(0, 256, shape + (3,), dtype=np.uint8)
+        resized = cv2.resize(roi, (64, 64), interpolation=cv2.INTER_AREA)
+        np.testing.assert_array_equal(extractor(roi), calc_hist_features(resized))
@@ -0,0 +1,56 @@
+import threading
+
+import numpy as np
+import pytest
+
+from inference_batcher import MicroBatcher
+
+
+def sizes(batch):
+    """Echoes the input size and the sum of every input"""
+    n = len(batch)
+    return np.full(n, batch.shape[1]), batch.reshape(n, -1).sum(axis=1)
+
+
+def test_mixed_input_sizes_are_run_separately():
+    batcher = MicroBatcher(sizes, max_batch_size=8, max_wait_ms=50)
+    imgs = [np.full((1, size, size, 3), k, np.uint8)
+            for k, size in enumerate((320, 416, 320, 416, 416))]
+    futures = [batcher.submit(img) for img in imgs]
+    results = [future.result(timeout=10) for future in futures]
+    batcher.close()
+
+    for img, (size, total) in zip(imgs, results):
+        assert size[0] == img.shape[1]
+        assert total[0] == img.sum()
+    assert batcher.stats()['batch_size']['count'] >= 2
+
+
+def test_submit_racing_close_never_hangs():
+    for _ in range(20):
+        batcher = MicroBatcher(sizes, max_batch_size=4, max_wait_ms=1)
+        futures = []
+        rejected = []
+        start = threading.Barrier(5)
+
+        def run():
+            start.wait(timeout=10)
+            for _ in range(50):
+                try:
+                    futures.append(batcher.submit(np.zeros((1, 8, 8, 3), np.uint8)))
+                except RuntimeError:
+                    rejected.append(True)
+                    return
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for t in threads:
+            t.start()
+        start.wait(timeout=10)
+        batcher.close()
+        for t in threads:
+            t.join()
+
+        for future in futures:
+            assert future.result(timeout=5)[1][0] == 0
+        with pytest.raises(RuntimeError):
+            batcher.submit(np.zeros((1, 8, 8, 3), np.uint8))
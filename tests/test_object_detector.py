@@ -0,0 +1,49 @@
+import threading
+
+import numpy as np
+
+from inference_batcher import MicroBatcher
+from object_detector import YoloV3Detector, PERSON
+
+
+def fake_yolo(batch):
+    """Detects one person over the non-padding region of every image, scored by its mean"""
+    n = len(batch)
+    boxes = np.zeros((n, 1, 4), np.float32)
+    scores = np.zeros((n, 1), np.float32)
+    size = batch.shape[1]
+    for i, img in enumerate(batch):
+        ys, xs = np.nonzero((img != 128).any(axis=-1))
+        boxes[i, 0] = (xs.min() / size, ys.min() / size,
+                       (xs.max() + 1) / size, (ys.max() + 1) / size)
+        scores[i, 0] = img[ys.min():ys.max() + 1, xs.min():xs.max() + 1].mean() / 255
+    return boxes, scores, np.zeros((n, 1), np.float32), np.ones(n, np.int32)
+
+
+def test_shared_detector_keeps_callers_apart():
+    batcher = MicroBatcher(fake_yolo, max_batch_size=6, max_wait_ms=50)
+    detector = YoloV3Detector(size=96, score_thresh=0.0, model=batcher)
+    # a different value and aspect ratio per caller
+    frames = [np.full((40 + 10 * k, 120 - 10 * k, 3), 20 + 30 * k, np.uint8) for k in range(6)]
+    barrier = threading.Barrier(len(frames))
+    results = [[] for _ in frames]
+
+    def run(k):
+        for _ in range(5):
+            barrier.wait()
+            results[k].append(detector.detect(frames[k]))
+
+    threads = [threading.Thread(target=run, args=(k,)) for k in range(len(frames))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert batcher.stats()['batch_size']['buckets']['1'] < 30
+    for k, frame in enumerate(frames):
+        for detections in results[k]:
+            (detection,) = detections
+            assert detection.label == PERSON
+            assert abs(detection.score - frame[0, 0, 0] / 255) < 1e-3
+            np.testing.assert_allclose(detection.box, (0, 0, 1, 1), atol=0.02)
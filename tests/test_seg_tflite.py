@@ -0,0 +1,72 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'coco models', 'tflite mobnetv1 ssd'))
+from seg_tflite import apply_nms
+
+tf = pytest.importorskip('tensorflow')
+
+
+def combined_nms(output_dict, iou_thresh=0.5, score_thresh=0.6):
+    """apply_nms before the NumPy rewrite, on tf.image.combined_non_max_suppression"""
+    q = 90 # no of classes
+    num = int(output_dict['num_detections'])
+    boxes = np.zeros([1, num, q, 4])
+    scores = np.zeros([1, num, q])
+    for i in range(num):
+        boxes[0, i, output_dict['detection_classes'][i], :] = output_dict['detection_boxes'][i]
+        scores[0, i, output_dict['detection_classes'][i]] = output_dict['detection_scores'][i]
+    nmsd = tf.image.combined_non_max_suppression(boxes=boxes,
+                                                 scores=scores,
+                                                 max_output_size_per_class=num,
+                                                 max_total_size=num,
+                                                 iou_threshold=iou_thresh,
+                                                 score_threshold=score_thresh,
+                                                 pad_per_class=False,
+                                                 clip_boxes=False)
+    valid = nmsd.valid_detections[0].numpy()
+    return {
+        'detection_boxes': nmsd.nmsed_boxes[0].numpy()[:valid],
+        'detection_classes': nmsd.nmsed_classes[0].numpy().astype(np.int64)[:valid],
+        'detection_scores': nmsd.nmsed_scores[0].numpy()[:valid],
+    }
+
+
+def random_detections(rng, num):
+    """Clustered boxes of a few classes, like the raw SSD outputs"""
+    centers = rng.random((3, 2)) * 0.8 + 0.1
+    center = centers[rng.integers(0, 3, num)] + rng.normal(0, 0.03, (num, 2))
+    half = rng.random((num, 2)) * 0.1 + 0.05
+    boxes = np.concatenate([center - half, center + half], axis=1).astype(np.float32)
+    return {
+        'detection_boxes': boxes,
+        'detection_classes': rng.choice([0, 0, 72, 76], num).astype(np.int64),
+        # distinct scores, combined NMS orders ties arbitrarily
+        'detection_scores': rng.permutation(np.linspace(0.3, 0.99, num)).astype(np.float32),
+        'num_detections': num,
+    }
+
+
+@pytest.mark.parametrize('iou_thresh,score_thresh', [(0.5, 0.6), (0.3, 0.4), (0.7, 0.5)])
+def test_matches_combined_nms(iou_thresh, score_thresh):
+    rng = np.random.default_rng(int(iou_thresh * 10 + score_thresh * 100))
+    for num in [1, 2, 5, 10, 25, 50]:
+        detections = random_detections(rng, num)
+        expected = combined_nms(detections, iou_thresh, score_thresh)
+        result = apply_nms(detections, iou_thresh, score_thresh)
+        for key in expected:
+            np.testing.assert_allclose(result[key], expected[key], rtol=0, atol=1e-6)
+
+
+def test_no_detections():
+    result = apply_nms({
+        'detection_boxes': np.zeros((10, 4), np.float32),
+        'detection_classes': np.zeros(10, np.int64),
+        'detection_scores': np.zeros(10, np.float32),
+        'num_detections': 0,
+    })
+    assert all(len(v) == 0 for v in result.values())
@@ -0,0 +1,60 @@
+import threading
+
+import numpy as np
+import pytest
+
+from yolo_quantize import TFLiteYolo
+
+tf = pytest.importorskip('tensorflow')
+
+SIZE = 32
+CLASSES = {0: 0.3, 63: 0.3, 67: 0.3}
+
+
+@pytest.fixture(scope='module')
+def model_path(tmp_path_factory):
+    """Tiny stand-in for a converted head whose outputs depend on the image"""
+    @tf.function(input_signature=[tf.TensorSpec([1, SIZE, SIZE, 3], tf.float32)])
+    def head(img):
+        outputs = []
+        for g in (1, 2, 4):
+            cells = tf.nn.avg_pool2d(img, SIZE // g, SIZE // g, 'VALID')
+            # 3 anchors of box, objectness and class logits
+            channels = tf.tile(cells, [1, 1, 1, 5 + len(CLASSES)])
+            outputs.append(tf.reshape(8 * channels - 4, [1, g, g, 3, 5 + len(CLASSES)]))
+        return outputs
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([head.get_concrete_function()])
+    path = tmp_path_factory.mktemp('tflite') / 'head.tflite'
+    path.write_bytes(converter.convert())
+    return str(path)
+
+
+@pytest.mark.parametrize('pool_size', [1, 2])
+def test_shared_model_keeps_callers_apart(model_path, pool_size):
+    model = TFLiteYolo(model_path, CLASSES, num_threads=1, pool_size=pool_size)
+    rng = np.random.default_rng(pool_size)
+    images = [rng.integers(0, 256, (1, SIZE, SIZE, 3), dtype=np.uint8) for _ in range(6)]
+    expected = [model(img) for img in images]
+    assert len({float(e[1][0, 0]) for e in expected}) > 1
+
+    barrier = threading.Barrier(len(images))
+    failures = []
+
+    def run(k):
+        try:
+            for _ in range(20):
+                barrier.wait(timeout=10)
+                result = model(images[k])
+                if not all(np.array_equal(a, b) for a, b in zip(result, expected[k])):
+                    failures.append(k)
+        except Exception as e:
+            failures.append(e)
+            barrier.abort()
+
+    threads = [threading.Thread(target=run, args=(k,)) for k in range(len(images))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not failures
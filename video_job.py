@@ -0,0 +1,420 @@
+"""
+Single pass analysis of a proctoring video
+
+The video is decoded once. Every frame runs face detection and facial
+landmarks once, and the results are handed to all enabled analyzers:
+    'eyes'    - eye gaze, from eye_tracker
+    'head'    - head pose, from head_pose_estimation
+    'mouth'   - mouth opening, from mouth_opening_detector
+    'objects' - person count and phones, from object_detector
+No windows are opened. The result is a JSON serializable dict with a record
+per analyzed frame and the events, runs of frames with the same finding,
+e.g. looking left from 3.2 s to 4.0 s. ``iter_video`` yields the same
+records and events one by one while the video is decoded, for streaming.
+"""
+
+import time
+import cv2
+import numpy as np
+
+from eye_tracker import eye_gaze, face_model, landmark_model
+from face_detector import find_faces
+from face_landmarks import detect_marks
+from head_pose_estimation import get_camera_matrix, head_pose_angles
+from mouth_opening_detector import lip_distances, mouth_open
+
+GAZE = {1: 'left', 2: 'right', 3: 'up'}
+
+
+class Analyzer:
+    """
+    Base class of the per-frame analyzers
+
+    Subclasses implement ``analyze`` which takes the BGR frame, the faces
+    found in it and their landmarks, and returns the JSON serializable
+    result of the frame and a list of the event kinds seen in it. Only the
+    first face, the candidate, is analyzed.
+    """
+    name = None
+    needs_landmarks = False
+
+    def analyze(self, frame, faces, marks):
+        raise NotImplementedError
+
+
+class EyeAnalyzer(Analyzer):
+    """Where the candidate is looking, 'left', 'right', 'up' or 'center'"""
+    name = 'eyes'
+    needs_landmarks = True
+
+    def __init__(self, threshold=75):
+        self.threshold = threshold
+
+    def analyze(self, frame, faces, marks):
+        if not marks:
+            return None, []
+        left, right, _ = eye_gaze(frame, marks[0], self.threshold)
+        gaze = GAZE.get(left, 'center') if left == right else 'center'
+        return gaze, ['looking_' + gaze] if gaze != 'center' else []
+
+
+class HeadPoseAnalyzer(Analyzer):
+    """Up-down and sideways angles of the candidate's head"""
+    name = 'head'
+    needs_landmarks = True
+
+    def __init__(self, limit=48):
+        self.limit = limit
+        self.camera_matrix = None
+
+    def analyze(self, frame, faces, marks):
+        if not marks:
+            return None, []
+        if self.camera_matrix is None:
+            self.camera_matrix = get_camera_matrix(frame.shape)
+        ang1, ang2, _, _ = head_pose_angles(frame, marks[0], self.camera_matrix)
+        events = []
+        if ang1 >= self.limit:
+            events.append('head_down')
+        elif ang1 <= -self.limit:
+            events.append('head_up')
+        if ang2 >= self.limit:
+            events.append('head_right')
+        elif ang2 <= -self.limit:
+            events.append('head_left')
+        return {'vertical': ang1, 'horizontal': ang2}, events
+
+
+class MouthAnalyzer(Analyzer):
+    """
+    Whether the candidate's mouth is open
+
+    There is no key to press in a recorded video, so the lip distances of
+    the first ``calibration_frames`` frames with a face are taken as the
+    closed mouth, like the 'r' key of mouth_opening_detector.
+    """
+    name = 'mouth'
+    needs_landmarks = True
+
+    def __init__(self, calibration_frames=30):
+        self.calibration_frames = calibration_frames
+        self._outer = []
+        self._inner = []
+        self.closed = None
+
+    def analyze(self, frame, faces, marks):
+        if not marks:
+            return None, []
+        if self.closed is None:
+            outer, inner = lip_distances(marks[0])
+            self._outer.append(outer)
+            self._inner.append(inner)
+            if len(self._outer) >= self.calibration_frames:
+                self.closed = ([sum(d) / len(d) for d in zip(*self._outer)],
+                               [sum(d) / len(d) for d in zip(*self._inner)])
+            return 'calibrating', []
+        is_open = mouth_open(marks[0], *self.closed)
+        return 'open' if is_open else 'closed', ['mouth_open'] if is_open else []
+
+
+class ObjectAnalyzer(Analyzer):
+    """
+    Number of persons and whether a phone is seen
+
+    Object detection is the slowest step, so it runs on every ``every``-th
+    analyzed frame and its result is carried over to the frames between.
+    """
+    name = 'objects'
+
+    def __init__(self, backend=None, every=5, size=320, detector=None):
+        # loads YOLOv3 or SSD-MobileNet, only when objects are analyzed
+        from object_detector import get_object_detector, count_objects
+        self.detector = detector or get_object_detector(backend, size=size)
+        self.count_objects = count_objects
+        self.every = every
+        self._frames = 0
+        self._last = None
+
+    def analyze(self, frame, faces, marks):
+        if self._frames % self.every == 0:
+            persons, phone = self.count_objects(self.detector.detect(frame))
+            events = []
+            if persons == 0:
+                events.append('no_person')
+            elif persons > 1:
+                events.append('multiple_persons')
+            if phone:
+                events.append('phone')
+            self._last = {'persons': persons, 'phone': phone}, events
+        self._frames += 1
+        return self._last
+
+
+ANALYZERS = {cls.name: cls for cls in (EyeAnalyzer, HeadPoseAnalyzer, MouthAnalyzer, ObjectAnalyzer)}
+
+
+class EventMerger:
+    """
+    Merges the event kinds of consecutive frames into events as they arrive
+
+    An event ends once its kind has been missing for more than ``max_gap``
+    seconds, so it is known as soon as the frame after the gap is analyzed.
+
+    Parameters
+    ----------
+    max_gap : float, optional
+        Seconds without the event that still continue it. The default is 0.5.
+    min_frames : int, optional
+        Events in fewer frames are dropped as flicker. The default is 2.
+
+    """
+    def __init__(self, max_gap=0.5, min_frames=2):
+        self.max_gap = max_gap
+        self.min_frames = min_frames
+        self._open = {}
+
+    def add(self, t, kinds):
+        """
+        Add the event kinds of a frame at time t
+
+        Returns
+        -------
+        events : list of dict
+            'event', 'start', 'end' and 'frames' of the events it ended
+
+        """
+        ended = []
+        for kind in list(self._open):
+            if kind not in kinds and t - self._open[kind]['end'] > self.max_gap:
+                ended.append(self._open.pop(kind))
+        for kind in kinds:
+            event = self._open.get(kind)
+            if event is None:
+                self._open[kind] = {'event': kind, 'start': t, 'end': t, 'frames': 1}
+            else:
+                event['end'] = t
+                event['frames'] += 1
+        return self._finish(ended)
+
+    def close(self):
+        """End the open events and return them"""
+        ended = list(self._open.values())
+        self._open = {}
+        return self._finish(ended)
+
+    def _finish(self, events):
+        events = [e for e in events if e['frames'] >= self.min_frames]
+        for e in events:
+            e['start'], e['end'] = round(e['start'], 3), round(e['end'], 3)
+        return sorted(events, key=lambda e: (e['start'], e['event']))
+
+
+def merge_events(frames, max_gap=0.5, min_frames=2):
+    """
+    Merge the event kinds of consecutive frames into events
+
+    Parameters
+    ----------
+    frames : list of (float, list of string)
+        Time and event kinds of every analyzed frame
+    max_gap : float, optional
+        Seconds without the event that still continue it. The default is 0.5.
+    min_frames : int, optional
+        Events in fewer frames are dropped as flicker. The default is 2.
+
+    Returns
+    -------
+    events : list of dict
+        'event', 'start', 'end' and 'frames' of every event, by start
+
+    """
+    merger = EventMerger(max_gap, min_frames)
+    events = []
+    for t, kinds in frames:
+        events.extend(merger.add(t, kinds))
+    events.extend(merger.close())
+    return sorted(events, key=lambda e: (e['start'], e['event']))
+
+
+def warm_up():
+    """
+    Run the face and landmark models once on a blank frame
+
+    The models are loaded when this module is imported, and the first
+    landmark inference also traces the TensorFlow graph. A worker process
+    calls this once, so its first job does not pay for either.
+    """
+    frame = np.zeros((480, 640, 3), np.uint8)
+    find_faces(frame, face_model)
+    detect_marks(frame, landmark_model, [220, 140, 420, 340])
+
+
+def iter_video(video_path=None, analyzers=None, every=1, max_frames=None, object_backend=None,
+               object_detector=None, on_progress=None, progress_every=30):
+    """
+    Run the analyzers on a video in one decoding pass, record by record
+
+    The video is opened and the analyzers are created right away, so bad
+    arguments raise here and not on the first record. The returned generator
+    decodes the next frame only when the next record is asked for, so a slow
+    consumer, e.g. a client reading a streamed response, paces the analysis
+    and nothing is buffered. Closing the generator releases the video.
+
+    Parameters
+    ----------
+    video_path : string, optional
+        Path or URL of the video. The default is None, the webcam, which
+        is read for max_frames or 300 frames.
+    analyzers : list of string, optional
+        Names of the analyzers, see ANALYZERS. The default is all of them.
+    every : int, optional
+        Analyze every n-th frame, at least 1. The default is 1.
+    max_frames : int, optional
+        Frames decoded at most. The default is None, the whole video.
+    object_backend : string, optional
+        object_detector backend. The default is the value of the
+        PROCTORING_DETECTOR environment variable or 'yolov3'.
+    object_detector : object_detector.ObjectDetector, optional
+        Already loaded detector, used instead of loading object_backend. It
+        may be shared with other threads, every backend is thread safe. The
+        default is None.
+    on_progress : callable, optional
+        Called with the number of decoded frames and the frame count of the
+        video, or None if unknown, every progress_every frames. The default
+        is None.
+    progress_every : int, optional
+        The default is 30.
+
+    Returns
+    -------
+    records : generator of (string, dict)
+        ('video', {'video', 'fps', 'total_frames', 'analyzers'}) first, then
+        ('frame', record) for every analyzed frame and ('event', event) as
+        soon as an event ends, and ('end', {'decoded_frames',
+        'analyzed_frames', 'seconds'}) last
+
+    """
+    names = list(ANALYZERS) if analyzers is None else list(analyzers)
+    unknown = [n for n in names if n not in ANALYZERS]
+    if unknown:
+        raise ValueError("Unknown analyzers: {}".format(', '.join(unknown)))
+    if every < 1:
+        raise ValueError("every must be at least 1, got {}".format(every))
+    if video_path is None or video_path == "":
+        video_path = 0
+        max_frames = max_frames or 300
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError("Could not open video {}".format(video_path))
+    try:
+        instances = [ObjectAnalyzer(object_backend, detector=object_detector)
+                     if n == ObjectAnalyzer.name else ANALYZERS[n]()
+                     for n in names]
+    except Exception:
+        cap.release()
+        raise
+    return _records(cap, video_path, names, instances, every, max_frames, on_progress,
+                    progress_every)
+
+
+def _records(cap, video_path, names, instances, every, max_frames, on_progress, progress_every):
+    needs_landmarks = any(a.needs_landmarks for a in instances)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        # frames that will be decoded, if known; streams and the webcam report none
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total <= 0:
+            total = max_frames
+        elif max_frames is not None:
+            total = min(total, max_frames)
+        yield 'video', {
+            'video': video_path if isinstance(video_path, str) else 'webcam',
+            'fps': fps,
+            'total_frames': total,
+            'analyzers': names
+        }
+
+        merger = EventMerger(max_gap=max(0.5, 2 * every / fps) if fps > 0 else 0.5)
+        start = time.perf_counter()
+        decoded = 0
+        analyzed = 0
+        while max_frames is None or decoded < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            index = decoded
+            decoded += 1
+            if on_progress is not None and decoded % progress_every == 0:
+                on_progress(decoded, total)
+            if index % every:
+                continue
+            t = index / fps if fps > 0 else cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            faces = find_faces(frame, face_model)
+            marks = [detect_marks(frame, landmark_model, face) for face in faces[:1]] \
+                if needs_landmarks else []
+            record = {'frame': index, 'time': round(t, 3), 'faces': len(faces)}
+            kinds = [] if faces else ['no_face']
+            for analyzer in instances:
+                value, events = analyzer.analyze(frame, faces, marks)
+                record[analyzer.name] = value
+                kinds.extend(events)
+            record['events'] = kinds
+            analyzed += 1
+            yield 'frame', record
+            for event in merger.add(t, kinds):
+                yield 'event', event
+    finally:
+        cap.release()
+
+    for event in merger.close():
+        yield 'event', event
+    yield 'end', {
+        'decoded_frames': decoded,
+        'analyzed_frames': analyzed,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+
+
+def analyze_video(video_path=None, analyzers=None, every=1, max_frames=None, include_frames=True,
+                  object_backend=None, object_detector=None, on_progress=None, progress_every=30):
+    """
+    Run the analyzers on a video in one decoding pass
+
+    Parameters
+    ----------
+    video_path, analyzers, every, max_frames, object_backend, object_detector,
+    on_progress, progress_every
+        See ``iter_video``
+    include_frames : bool, optional
+        Whether the per-frame records are returned. The default is True.
+
+    Returns
+    -------
+    result : dict
+        'video', 'fps', 'decoded_frames', 'analyzed_frames', 'seconds',
+        'analyzers', 'events' and, if include_frames, 'frames'
+
+    """
+    records = iter_video(video_path, analyzers, every, max_frames, object_backend,
+                         object_detector, on_progress, progress_every)
+    frames = []
+    events = []
+    for kind, record in records:
+        if kind == 'video':
+            video = record
+        elif kind == 'frame':
+            if include_frames:
+                frames.append(record)
+        elif kind == 'event':
+            events.append(record)
+        else:
+            end = record
+
+    result = {'video': video['video'], 'fps': video['fps']}
+    result.update(end)
+    result['analyzers'] = video['analyzers']
+    result['events'] = sorted(events, key=lambda e: (e['start'], e['event']))
+    if include_frames:
+        result['frames'] = frames
+    return result
@@ -0,0 +1,89 @@
+"""
+YOLOv3 anchors and input preprocessing shared by all YOLO backends
+
+Kept apart from person_and_phone, which builds the float32 Keras model when
+it is imported, so the quantized TFLite backend of yolo_quantize can
+letterbox its inputs without loading the Tensorflow model.
+"""
+
+import cv2
+import numpy as np
+
+yolo_anchors = np.array([(10, 13), (16, 30), (33, 23), (30, 61), (62, 45),
+                         (59, 119), (116, 90), (156, 198), (373, 326)],
+                        np.float32) / 416
+
+yolo_anchor_masks = np.array([[6, 7, 8], [3, 4, 5], [0, 1, 2]])
+
+
+class Letterbox:
+    """
+    Aspect preserving resize of frames into a reusable uint8 buffer
+
+    The frame is scaled to fit the square network input and centred on a
+    grey background, so objects keep their shape on 16:9 webcams. The buffer
+    and the geometry used by ``unmap_boxes`` are reused between calls, so
+    they must be consumed before the next call and a letterbox must not be
+    shared between threads.
+
+    Parameters
+    ----------
+    size : int
+        Side of the square network input
+    fill : int, optional
+        Value of the padding. The default is 128.
+
+    """
+    def __init__(self, size, fill=128):
+        self.size = size
+        self.fill = fill
+        self.buffer = np.full((1, size, size, 3), fill, dtype=np.uint8)
+        self._shape = None
+
+    def __call__(self, img):
+        """
+        Letterbox a BGR frame
+
+        Parameters
+        ----------
+        img : np.uint8
+            BGR frame of any size
+
+        Returns
+        -------
+        buffer : np.uint8
+            Batch of one letterboxed BGR image of shape (1, size, size, 3)
+
+        """
+        h, w = img.shape[:2]
+        if self._shape != (h, w):
+            self._shape = (h, w)
+            scale = min(self.size / w, self.size / h)
+            self.new_w, self.new_h = int(round(w * scale)), int(round(h * scale))
+            self.dx = (self.size - self.new_w) // 2
+            self.dy = (self.size - self.new_h) // 2
+            self.buffer.fill(self.fill)
+            self._region = self.buffer[0, self.dy:self.dy + self.new_h, self.dx:self.dx + self.new_w]
+        self._region[...] = cv2.resize(img, (self.new_w, self.new_h),
+                                       interpolation=cv2.INTER_LINEAR)
+        return self.buffer
+
+    def unmap_boxes(self, boxes):
+        """
+        Map normalized boxes of the letterboxed image back to the frame
+
+        Parameters
+        ----------
+        boxes : np.array
+            Boxes as normalized (x1, y1, x2, y2) of the letterboxed image
+
+        Returns
+        -------
+        boxes : np.array
+            Boxes as normalized (x1, y1, x2, y2) of the last frame
+
+        """
+        boxes = np.asarray(boxes, dtype=np.float32) * self.size
+        boxes[..., 0::2] = (boxes[..., 0::2] - self.dx) / self.new_w
+        boxes[..., 1::2] = (boxes[..., 1::2] - self.dy) / self.new_h
+        return np.clip(boxes, 0.0, 1.0)
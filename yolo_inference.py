@@ -0,0 +1,190 @@
+"""
+Compiled YOLOv3 inference
+
+Calling the Keras model eagerly as ``yolo(img)`` dispatches every layer from
+Python on each call. ``CompiledYolo`` traces the forward pass together with
+NMS once per configured input size with a fixed input signature, warms each
+function up at load and reuses them, so no retracing happens in the hot path.
+
+Given ``class_thresholds`` it replaces the 80 class NMS of the model with a
+proctoring head that only scores and suppresses the listed classes.
+
+With ``uint8_input`` the functions take letterboxed uint8 BGR frames from
+``yolo_common.Letterbox`` and do the channel swap, cast and normalisation in
+the graph.
+"""
+
+import numpy as np
+import tensorflow as tf
+
+from person_and_phone import yolo_boxes
+from yolo_common import yolo_anchors, yolo_anchor_masks
+
+
+def yolo_filtered_nms(outputs, class_ids, score_thresholds, max_detections=100,
+                      iou_threshold=0.5):
+    """
+    Non-maximum suppression over a subset of classes with per-class thresholds
+
+    Parameters
+    ----------
+    outputs : list of tuple
+        (bbox, objectness, class_probs) of every scale, where class_probs
+        only holds the classes in class_ids.
+    class_ids : tf.Tensor
+        COCO ids of the kept classes
+    score_thresholds : tf.Tensor
+        Minimum score of every kept class
+    max_detections : int, optional
+        Maximum number of detections per class and in total. The default is 100.
+    iou_threshold : float, optional
+        Intersection Over Union threshold. The default is 0.5.
+
+    Returns
+    -------
+    boxes, scores, classes, valid_detections : tf.Tensor
+        Same layout as ``yolo_nms`` with classes as COCO ids
+
+    """
+    bbox = tf.concat([tf.reshape(o[0], (tf.shape(o[0])[0], -1, 4)) for o in outputs], axis=1)
+    confidence = tf.concat([tf.reshape(o[1], (tf.shape(o[1])[0], -1, 1)) for o in outputs], axis=1)
+    class_probs = tf.concat([tf.reshape(o[2], (tf.shape(o[2])[0], -1, tf.shape(o[2])[-1]))
+                             for o in outputs], axis=1)
+
+    scores = confidence * class_probs
+    # zero out scores under their class threshold so one NMS call handles all
+    scores = tf.where(scores >= score_thresholds, scores, tf.zeros_like(scores))
+    boxes, scores, classes, valid_detections = tf.image.combined_non_max_suppression(
+        boxes=tf.expand_dims(bbox, 2),
+        scores=scores,
+        max_output_size_per_class=max_detections,
+        max_total_size=max_detections,
+        iou_threshold=iou_threshold,
+        score_threshold=tf.reduce_min(score_thresholds)
+    )
+    classes = tf.cast(tf.gather(class_ids, tf.cast(classes, tf.int32)), tf.float32)
+    return boxes, scores, classes, valid_detections
+
+
+class CompiledYolo:
+    """
+    YOLOv3 forward pass and NMS compiled with fixed input signatures
+
+    Parameters
+    ----------
+    model : tf.keras.Model, optional
+        YOLOv3 model. The default is the one loaded by person_and_phone.
+    sizes : tuple of int, optional
+        Square input sizes to compile. The default is (320, 416).
+    class_thresholds : dict, optional
+        COCO class id to score threshold. When given, only these classes are
+        scored and passed to NMS. The default is None, which keeps the NMS of
+        the model over all 80 classes.
+    uint8_input : bool, optional
+        Whether inputs are uint8 BGR images, converted to normalized RGB in
+        the graph, instead of float32 RGB in [0, 1]. The default is False.
+
+    """
+    def __init__(self, model=None, sizes=(320, 416), class_thresholds=None,
+                 uint8_input=False):
+        if model is None:
+            from person_and_phone import yolo as model
+        self.model = model
+        self.class_thresholds = class_thresholds
+        self.input_dtype = tf.uint8 if uint8_input else tf.float32
+        if class_thresholds is not None:
+            ids = sorted(class_thresholds)
+            self._class_ids = tf.constant(ids, tf.int32)
+            self._pred_ids = tf.constant([0, 1, 2, 3, 4] + [5 + i for i in ids], tf.int32)
+            self._score_thresholds = tf.constant([class_thresholds[i] for i in ids], tf.float32)
+        self._functions = {}
+        for size in sizes:
+            self.add_size(size)
+
+    def raw_outputs(self, img):
+        """
+        Predictions of the three YOLO output layers for the kept classes only
+
+        Parameters
+        ----------
+        img : tf.Tensor
+            Batch of RGB images with values in [0, 1]
+
+        Returns
+        -------
+        outputs : list of tf.Tensor
+            (batch, grid, grid, anchors, 5 + kept classes) for every scale,
+            in the order of ``yolo_anchor_masks``
+
+        """
+        model = self.model
+        x_36, x_61, x = model.get_layer('yolo_darknet')(img, training=False)
+        x = model.get_layer('yolo_conv_0')(x, training=False)
+        output_0 = model.get_layer('yolo_output_0')(x, training=False)
+        x = model.get_layer('yolo_conv_1')((x, x_61), training=False)
+        output_1 = model.get_layer('yolo_output_1')(x, training=False)
+        x = model.get_layer('yolo_conv_2')((x, x_36), training=False)
+        output_2 = model.get_layer('yolo_output_2')(x, training=False)
+        # keep box, objectness and the wanted class logits only
+        return [tf.gather(output, self._pred_ids, axis=-1)
+                for output in (output_0, output_1, output_2)]
+
+    def _forward(self, img):
+        if self.input_dtype == tf.uint8:
+            # BGR uint8 to RGB float in [0, 1]
+            img = tf.cast(tf.reverse(img, axis=[-1]), tf.float32) / 255.0
+        if self.class_thresholds is None:
+            return self.model(img, training=False)
+
+        n_classes = len(self.class_thresholds)
+        outputs = [yolo_boxes(pred, yolo_anchors[mask], n_classes)[:3]
+                   for pred, mask in zip(self.raw_outputs(img), yolo_anchor_masks)]
+        return yolo_filtered_nms(outputs, self._class_ids, self._score_thresholds)
+
+    def add_size(self, size):
+        """
+        Compile and warm up the function for an input size
+
+        Parameters
+        ----------
+        size : int
+            Side of the square network input
+
+        Returns
+        -------
+        None.
+
+        """
+        if size in self._functions:
+            return
+        signature = [tf.TensorSpec([None, size, size, 3], self.input_dtype)]
+        function = tf.function(self._forward, input_signature=signature)
+        function(tf.zeros([1, size, size, 3], self.input_dtype))
+        self._functions[size] = function
+
+    @property
+    def sizes(self):
+        return tuple(self._functions)
+
+    def __call__(self, img):
+        """
+        Run detection on a preprocessed batch
+
+        Parameters
+        ----------
+        img : Array of float32 or uint8
+            Batch of shape (n, size, size, 3), RGB with values in [0, 1]
+            or BGR uint8 if compiled with ``uint8_input``
+
+        Returns
+        -------
+        boxes, scores, classes, nums : tf.Tensor
+            Same outputs as the YOLOv3 model
+
+        """
+        size = img.shape[1]
+        function = self._functions.get(size)
+        if function is None or img.shape[2] != size:
+            raise ValueError("Input size {} is not compiled, available sizes: {}".format(
+                tuple(img.shape[1:3]), self.sizes))
+        return function(np.asarray(img, dtype=self.input_dtype.as_numpy_dtype))
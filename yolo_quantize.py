@@ -0,0 +1,371 @@
+"""
+Post-training quantization of YOLOv3 for CPU inference
+
+The YOLOv3 head for the proctoring classes is converted with the TFLite
+converter into one of these variants, written to
+models/yolov3_<variant>_<size>.tflite:
+    'dynamic' - dynamic range quantization, int8 weights with float activations
+    'float16' - float16 weights
+    'int8'    - full integer quantization calibrated on exam frames
+Box decoding and NMS run in NumPy/OpenCV, so ``TFLiteYolo`` is a drop-in
+model for ``object_detector.YoloV3Detector``.
+
+Usage:
+    python yolo_quantize.py exam_frames/ [--size 416] [--variants int8 ...] [--report]
+where exam_frames/ holds images or videos. --report compares every variant
+with the float32 model: average precision on person and phone, taking the
+float32 detections as reference, and speedup.
+"""
+
+import argparse
+import os
+import queue
+import time
+import cv2
+import numpy as np
+
+from yolo_common import Letterbox, yolo_anchors, yolo_anchor_masks
+
+# Get the directory where this script is located
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+VARIANTS = ('dynamic', 'float16', 'int8')
+
+# normalized anchors of the three output scales, largest objects first
+YOLO_ANCHORS = yolo_anchors[yolo_anchor_masks]
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def tflite_path(variant, size):
+    """Path of a converted model"""
+    return os.path.join(SCRIPT_DIR, 'models', 'yolov3_{}_{}.tflite'.format(variant, size))
+
+
+def read_frames(paths, max_frames=100, every=10):
+    """
+    Read BGR frames from images, videos or directories of them
+
+    Parameters
+    ----------
+    paths : list of string
+        Image files, video files or directories
+    max_frames : int, optional
+        Maximum number of frames. The default is 100.
+    every : int, optional
+        Use every n-th frame of videos. The default is 10.
+
+    Returns
+    -------
+    frames : list of np.uint8
+
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, f) for f in sorted(os.listdir(path)))
+        else:
+            files.append(path)
+
+    frames = []
+    for path in files:
+        if len(frames) >= max_frames:
+            break
+        if path.lower().endswith(IMAGE_EXTENSIONS):
+            img = cv2.imread(path)
+            if img is not None:
+                frames.append(img)
+            continue
+        cap = cv2.VideoCapture(path)
+        index = 0
+        while len(frames) < max_frames:
+            ret, img = cap.read()
+            if not ret:
+                break
+            if index % every == 0:
+                frames.append(img)
+            index += 1
+        cap.release()
+    return frames
+
+
+def convert(variant, size, frames=None, class_ids=None, path=None):
+    """
+    Convert the YOLOv3 proctoring head to a quantized TFLite model
+
+    Parameters
+    ----------
+    variant : string
+        'dynamic', 'float16' or 'int8'
+    size : int
+        Side of the square network input
+    frames : list of np.uint8, optional
+        Representative BGR exam frames, required for 'int8'
+    class_ids : list of int, optional
+        COCO ids kept in the outputs. The default is the proctoring classes
+        of object_detector.
+    path : string, optional
+        Output file. The default is models/yolov3_<variant>_<size>.tflite.
+
+    Returns
+    -------
+    path : string
+        Path of the written model
+
+    """
+    import tensorflow as tf
+    from tensorflow.python.framework.convert_to_constants import convert_variables_to_constants_v2
+    from yolo_inference import CompiledYolo
+    from object_detector import YOLO_LABELS
+
+    if variant not in VARIANTS:
+        raise ValueError("Unknown variant {}, expected one of {}".format(variant, VARIANTS))
+    if variant == 'int8' and not frames:
+        raise ValueError("int8 quantization needs representative frames")
+    if class_ids is None:
+        class_ids = sorted(YOLO_LABELS)
+    if path is None:
+        path = tflite_path(variant, size)
+
+    head = CompiledYolo(sizes=(), class_thresholds={i: 0.0 for i in class_ids})
+    function = tf.function(head.raw_outputs,
+                           input_signature=[tf.TensorSpec([1, size, size, 3], tf.float32)])
+    # fold the weights into constants, the int8 calibrator can't read variables
+    function = convert_variables_to_constants_v2(function.get_concrete_function())
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([function])
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if variant == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == 'int8':
+        letterbox = Letterbox(size)
+
+        def representative_dataset():
+            for frame in frames:
+                img = letterbox(frame)[..., ::-1].astype(np.float32) / 255.0
+                yield [img]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    model = converter.convert()
+    with open(path, 'wb') as f:
+        f.write(model)
+    return path
+
+
+def _sigmoid(x):
+    # tanh form does not overflow for large negative logits
+    return 0.5 * np.tanh(0.5 * x) + 0.5
+
+
+class TFLiteYolo:
+    """
+    Quantized YOLOv3 proctoring head run with the TFLite interpreter
+
+    Takes the same letterboxed uint8 BGR batches and returns the same
+    (boxes, scores, classes, nums) outputs as ``CompiledYolo`` with
+    ``uint8_input`` and ``class_thresholds``. An interpreter can only run
+    one inference at a time, so every call checks one out of a pool, and
+    threads sharing the model wait for a free one.
+
+    Parameters
+    ----------
+    model_path : string
+        Path to a model written by ``convert``
+    class_thresholds : dict
+        COCO class id to score threshold, the same classes it was converted with
+    num_threads : int, optional
+        Number of threads of each interpreter. The default is 4.
+    iou_threshold : float, optional
+        Intersection Over Union threshold of NMS. The default is 0.5.
+    max_detections : int, optional
+        Maximum number of detections. The default is 100.
+    pool_size : int, optional
+        Number of interpreters. The default is 1.
+
+    """
+    def __init__(self, model_path, class_thresholds, num_threads=4,
+                 iou_threshold=0.5, max_detections=100, pool_size=1):
+        try:
+            # the small interpreter only package is enough for a TFLite model
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        self._interpreters = queue.Queue()
+        for _ in range(pool_size):
+            interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+            interpreter.allocate_tensors()
+            self._interpreters.put(interpreter)
+        self.input_details = interpreter.get_input_details()[0]
+        _, self.size, _, _ = self.input_details['shape']
+        self.class_ids = np.array(sorted(class_thresholds))
+        self.score_thresholds = np.array([class_thresholds[i] for i in self.class_ids], np.float32)
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+
+        # match outputs to anchors by grid size, coarsest grid first
+        outputs = interpreter.get_output_details()
+        self.output_details = sorted(outputs, key=lambda d: d['shape'][1])
+        n_classes = self.output_details[0]['shape'][-1] - 5
+        if n_classes != len(self.class_ids):
+            raise ValueError("{} was converted with {} classes, got {}".format(
+                model_path, n_classes, len(self.class_ids)))
+        self._grids = []
+        for details in self.output_details:
+            g = details['shape'][1]
+            x, y = np.meshgrid(np.arange(g), np.arange(g))
+            self._grids.append(np.stack([x, y], axis=-1)[:, :, np.newaxis, :].astype(np.float32))
+
+    def _decode(self, preds):
+        boxes, scores = [], []
+        for pred, grid, anchors in zip(preds, self._grids, YOLO_ANCHORS):
+            g = pred.shape[0]
+            box_xy = (_sigmoid(pred[..., 0:2]) + grid) / g
+            box_wh = np.exp(pred[..., 2:4]) * anchors
+            box = np.concatenate([box_xy - box_wh / 2, box_xy + box_wh / 2], axis=-1)
+            boxes.append(box.reshape(-1, 4))
+            scores.append((_sigmoid(pred[..., 4:5]) * _sigmoid(pred[..., 5:])).reshape(
+                -1, len(self.class_ids)))
+        return np.concatenate(boxes), np.concatenate(scores)
+
+    def __call__(self, img):
+        img = img[..., ::-1].astype(np.float32) / 255.0
+        interpreter = self._interpreters.get()
+        try:
+            interpreter.set_tensor(self.input_details['index'], img)
+            interpreter.invoke()
+            # get_tensor copies, the interpreter can go back to the pool
+            preds = [interpreter.get_tensor(details['index'])[0]
+                     for details in self.output_details]
+        finally:
+            self._interpreters.put(interpreter)
+        boxes, scores = self._decode(preds)
+
+        anchor, cls = np.nonzero(scores >= self.score_thresholds)
+        keep = []
+        if len(anchor):
+            candidates = boxes[anchor]
+            rects = np.concatenate([candidates[:, :2], candidates[:, 2:] - candidates[:, :2]], axis=1)
+            candidate_scores = scores[anchor, cls]
+            keep = cv2.dnn.NMSBoxesBatched(rects.tolist(), candidate_scores.tolist(), cls.tolist(),
+                                           0.0, self.iou_threshold)
+            keep = np.array(keep, dtype=np.int64).reshape(-1)
+            keep = keep[np.argsort(-candidate_scores[keep], kind='stable')][:self.max_detections]
+
+        n = len(keep)
+        out_boxes = np.zeros((1, self.max_detections, 4), np.float32)
+        out_scores = np.zeros((1, self.max_detections), np.float32)
+        out_classes = np.zeros((1, self.max_detections), np.float32)
+        if n:
+            out_boxes[0, :n] = np.clip(boxes[anchor[keep]], 0.0, 1.0)
+            out_scores[0, :n] = scores[anchor[keep], cls[keep]]
+            out_classes[0, :n] = self.class_ids[cls[keep]]
+        return out_boxes, out_scores, out_classes, np.array([n], np.int32)
+
+
+def _iou(box, boxes):
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def average_precision(predictions, references, label, iou_threshold=0.5):
+    """
+    Average precision of one label over many frames
+
+    Parameters
+    ----------
+    predictions : list of list of Detection
+        Detections to evaluate, one list per frame
+    references : list of list of Detection
+        Ground truth detections, one list per frame
+    label : string
+        Label to evaluate
+    iou_threshold : float, optional
+        Minimum IoU of a match. The default is 0.5.
+
+    Returns
+    -------
+    ap : float
+        Average precision, nan if the references have no such label
+
+    """
+    truth = [np.array([d.box for d in ref if d.label == label]).reshape(-1, 4) for ref in references]
+    n_truth = sum(len(t) for t in truth)
+    if n_truth == 0:
+        return float('nan')
+    ranked = sorted(((d.score, i, d.box) for i, pred in enumerate(predictions)
+                     for d in pred if d.label == label), key=lambda p: -p[0])
+    matched = [np.zeros(len(t), bool) for t in truth]
+    tp = np.zeros(len(ranked))
+    for k, (_, i, box) in enumerate(ranked):
+        if len(truth[i]) == 0:
+            continue
+        ious = _iou(np.asarray(box), truth[i])
+        j = int(np.argmax(ious))
+        if ious[j] >= iou_threshold and not matched[i][j]:
+            matched[i][j] = True
+            tp[k] = 1
+    if len(ranked) == 0:
+        return 0.0
+    recall = np.cumsum(tp) / n_truth
+    precision = np.cumsum(tp) / np.arange(1, len(ranked) + 1)
+    # all-point interpolated area under the precision/recall curve
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    recall = np.concatenate([[0.0], recall])
+    return float(np.sum((recall[1:] - recall[:-1]) * precision))
+
+
+def report(frames, size, variants, num_threads=4):
+    """Print AP against the float32 model and speedup of every variant"""
+    from object_detector import YoloV3Detector, PERSON, PHONE
+
+    def run(detector):
+        detector.detect(frames[0])  # warm up
+        results = []
+        start = time.perf_counter()
+        for frame in frames:
+            results.append(detector.detect(frame))
+        return results, (time.perf_counter() - start) / len(frames) * 1000
+
+    reference, reference_ms = run(YoloV3Detector(size=size))
+    print(f"\n{'variant':<10}{'ms':>10}{'speedup':>10}{'AP person':>12}{'AP phone':>12}")
+    print(f"{'float32':<10}{reference_ms:>10.1f}{1.0:>10.2f}{1.0:>12.3f}{1.0:>12.3f}")
+    for variant in variants:
+        detector = YoloV3Detector(size=size, variant=variant, num_threads=num_threads)
+        results, ms = run(detector)
+        ap_person = average_precision(results, reference, PERSON)
+        ap_phone = average_precision(results, reference, PHONE)
+        print(f"{variant:<10}{ms:>10.1f}{reference_ms / ms:>10.2f}{ap_person:>12.3f}{ap_phone:>12.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize YOLOv3 with the TFLite converter")
+    parser.add_argument('frames', nargs='+', help="exam images, videos or directories of them")
+    parser.add_argument('--size', type=int, default=416)
+    parser.add_argument('--variants', nargs='+', default=list(VARIANTS), choices=VARIANTS)
+    parser.add_argument('--max-frames', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--report', action='store_true', help="report AP drop and speedup")
+    args = parser.parse_args()
+
+    frames = read_frames(args.frames, args.max_frames)
+    if not frames:
+        print("Error: Could not read any frames")
+        return
+    for variant in args.variants:
+        print(f"Converting {variant} ({len(frames)} calibration frames)...")
+        print(f"Saved {convert(variant, args.size, frames)}")
+    if args.report:
+        report(frames, args.size, args.variants, args.threads)
+
+
+if __name__ == '__main__':
+    main()